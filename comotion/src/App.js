@@ -9,6 +9,7 @@
  */
 
 import React, { useState } from 'react';
+import axios from 'axios';
 import Login from './Login';
 import InvoiceFetcher from './InvoiceFetcher';
 import './styles.css';
@@ -16,23 +17,28 @@ import './styles.css';
 const App = () => {
     // Authentication state management
     // isAuthenticated: boolean flag for login status
-    // email/password: stored credentials for API calls
-    const [auth, setAuth] = useState({ isAuthenticated: false, email: '', password: '' });
+    // email: signed-in user, token: session token issued by /login for API calls
+    const [auth, setAuth] = useState({ isAuthenticated: false, email: '', token: '' });
 
     /**
      * Handle successful user login
      * @param {string} email - User's email/username
-     * @param {string} password - User's password
+     * @param {string} token - Session token returned by the backend
      */
-    const handleLogin = (email, password) => {
-        setAuth({ isAuthenticated: true, email, password });
+    const handleLogin = (email, token) => {
+        setAuth({ isAuthenticated: true, email, token });
     };
 
     /**
-     * Handle user logout
+     * Handle user logout (also used when the session expires)
      */
     const handleLogout = () => {
-        setAuth({ isAuthenticated: false, email: '', password: '' });
+        if (auth.token) {
+            axios.post('http://localhost:5000/logout', null, {
+                headers: { Authorization: `Bearer ${auth.token}` }
+            }).catch(() => {});
+        }
+        setAuth({ isAuthenticated: false, email: '', token: '' });
     };
 
     return (
@@ -42,7 +48,7 @@ const App = () => {
                 // Show main application interface after login
                 <InvoiceFetcher 
                     email={auth.email} 
-                    password={auth.password}
+                    token={auth.token}
                     onLogout={handleLogout}
                 />
             ) : (
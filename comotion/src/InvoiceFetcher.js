@@ -2,7 +2,7 @@
  * InvoiceFetcher Component - Main Invoice Management Interface
  * 
  * This component provides the core functionality for:
- * - Selecting teams/companies from CoMotion workspace
+ * - Searching teams/companies from CoMotion workspace (type-ahead)
  * - Choosing multiple time periods for reporting
  * - Fetching and displaying invoice data
  * - Generating Excel reports for download
@@ -13,43 +13,64 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 
-const InvoiceFetcher = ({ email, password, onLogout }) => {
+const InvoiceFetcher = ({ email, token, onLogout }) => {
     // State management for form inputs and data
     const [teamName, setTeamName] = useState('');
     const [selectedMonths, setSelectedMonths] = useState([{ month: '', year: '' }]);
+    const [teamQuery, setTeamQuery] = useState('');
     const [teams, setTeams] = useState([]);
+    const [showSuggestions, setShowSuggestions] = useState(false);
     const [invoices, setInvoices] = useState([]);
     const [isLoading, setIsLoading] = useState(false);
     const [error, setError] = useState('');
 
+    // Every API call authenticates with the session token from /login
+    const authHeaders = { Authorization: `Bearer ${token}` };
+
     /**
-     * Fetch available teams from the CoMotion workspace on component mount
+     * Look up teams matching the typed prefix (server-side type-ahead search)
      */
     useEffect(() => {
-        const fetchTeams = async () => {
+        const controller = new AbortController();
+        const searchTeams = async () => {
             try {
-                setIsLoading(true);
-                const response = await axios.get('http://localhost:5000/get_teams', {
-                    headers: {
-                        username: email,
-                        password: password
-                    }
+                const response = await axios.get('http://localhost:5000/search_teams', {
+                    headers: authHeaders,
+                    params: { q: teamQuery, size: 20 },
+                    signal: controller.signal
                 });
-                // Extract team records from API response
+                // Only the first page of matches is shown as suggestions
                 setTeams(response.data.Records || []);
             } catch (error) {
+                if (axios.isCancel(error)) {
+                    return;  // Superseded by a newer keystroke
+                }
+                if (error.response && error.response.status === 401) {
+                    onLogout();  // Session expired - back to the login form
+                    return;
+                }
                 setError('Failed to load teams. Please refresh the page.');
-                console.error('Failed to fetch teams:', error);
-            } finally {
-                setIsLoading(false);
+                console.error('Failed to search teams:', error);
             }
         };
 
-        // Only fetch teams if credentials are available
-        if (email && password) {
-            fetchTeams();
-        }
-    }, [email, password]);
+        // Wait for a pause in typing before asking the server
+        const timer = token ? setTimeout(searchTeams, 150) : null;
+        return () => {
+            clearTimeout(timer);
+            controller.abort();
+        };
+    }, [teamQuery, token]);  // eslint-disable-line react-hooks/exhaustive-deps
+
+    /**
+     * Pick a team from the suggestion list
+     * @param {Object} team - Team record returned by /search_teams
+     */
+    const selectTeam = (team) => {
+        setTeamName(team.TeamName);
+        setTeamQuery(team.TeamName);
+        setShowSuggestions(false);
+    };
 
     /**
      * Validate form inputs before making API calls
@@ -95,10 +116,10 @@ const InvoiceFetcher = ({ email, password, onLogout }) => {
         setIsLoading(true);
         try {
             const response = await axios.post('http://localhost:5000/get_invoices', { 
-                email, 
-                password, 
                 team_name: teamName, 
                 months: selectedMonths.map(m => ({ month: parseInt(m.month), year: parseInt(m.year) }))
+            }, {
+                headers: authHeaders
             });
             
             if (response.status === 200) {
@@ -108,7 +129,9 @@ const InvoiceFetcher = ({ email, password, onLogout }) => {
                 }
             }
         } catch (error) {
-            if (error.response && error.response.data && error.response.data.error) {
+            if (error.response && error.response.status === 401) {
+                onLogout();  // Session expired - back to the login form
+            } else if (error.response && error.response.data && error.response.data.error) {
                 setError(error.response.data.error);
             } else {
                 setError('Failed to fetch invoices. Please try again.');
@@ -130,11 +153,10 @@ const InvoiceFetcher = ({ email, password, onLogout }) => {
         setIsLoading(true);
         try {
             const response = await axios.post('http://localhost:5000/generate_excel', { 
-                email, 
-                password, 
                 team_name: teamName, 
                 months: selectedMonths.map(m => ({ month: parseInt(m.month), year: parseInt(m.year) }))
             }, { 
+                headers: authHeaders,
                 responseType: 'blob'  // Important for file downloads
             });
             
@@ -154,7 +176,9 @@ const InvoiceFetcher = ({ email, password, onLogout }) => {
             document.body.removeChild(link);
             window.URL.revokeObjectURL(url);
         } catch (error) {
-            if (error.response && error.response.data) {
+            if (error.response && error.response.status === 401) {
+                onLogout();  // Session expired - back to the login form
+            } else if (error.response && error.response.data) {
                 // Convert blob error to text for better error handling
                 const reader = new FileReader();
                 reader.onload = function() {
@@ -237,23 +261,39 @@ const InvoiceFetcher = ({ email, password, onLogout }) => {
                     </div>
                 )}
 
-                {/* Team/Company Selection Dropdown */}
-                <div className="form-group">
-                    <label htmlFor="team-select">Select Team/Company:</label>
-                    <select 
-                        id="team-select"
-                        value={teamName} 
-                        onChange={(e) => setTeamName(e.target.value)}
+                {/* Team/Company Type-Ahead Search */}
+                <div className="form-group team-search">
+                    <label htmlFor="team-search">Select Team/Company:</label>
+                    <input 
+                        id="team-search"
+                        type="text"
+                        placeholder="Start typing a team name..."
+                        value={teamQuery}
+                        onChange={(e) => {
+                            setTeamQuery(e.target.value);
+                            setTeamName('');
+                            setShowSuggestions(true);
+                        }}
+                        onFocus={() => setShowSuggestions(true)}
+                        onBlur={() => setShowSuggestions(false)}
                         disabled={isLoading}
-                        className="form-select"
-                    >
-                        <option value="">Choose a team...</option>
-                        {teams.map(team => (
-                            <option key={team.RecordID} value={team.TeamName}>
-                                {team.TeamName}
-                            </option>
-                        ))}
-                    </select>
+                        autoComplete="off"
+                    />
+                    {showSuggestions && teams.length > 0 && (
+                        <ul className="team-suggestions">
+                            {teams.map(team => (
+                                <li 
+                                    key={team.RecordID}
+                                    onMouseDown={(e) => {
+                                        e.preventDefault();  // Keep focus until the click lands
+                                        selectTeam(team);
+                                    }}
+                                >
+                                    {team.TeamName}
+                                </li>
+                            ))}
+                        </ul>
+                    )}
                 </div>
                 
                 {/* Dynamic Month/Year Selection Inputs */}
@@ -45,8 +45,9 @@ const Login = ({ onLogin }) => {
             });
             
             if (response.status === 200) {
-                // Authentication successful - notify parent component
-                onLogin(email, password);
+                // Authentication successful - hand the session token to the parent
+                // so the password does not need to be kept or resent
+                onLogin(email, response.data.token);
             }
         } catch (error) {
             // Handle authentication errors with specific messages
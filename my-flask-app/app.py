@@ -10,24 +10,117 @@ Created for: CoMotion Startup Incubator
 """
 
 import base64
+import hashlib
+import json
+import os
+import queue
+import re
+import shutil
+import threading
+import zipfile
 import requests
 import logging
-from flask import Flask, request, jsonify, send_file
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from itertools import chain
+from flask import Flask, Response, request, jsonify, send_file, g
 from flask_cors import CORS
-import pandas as pd
-from io import BytesIO
-from datetime import datetime
+import tempfile
+from datetime import datetime, timezone
 import calendar
+import nexudus_client
+import invoice_mirror
+import invoice_export
+import upstream_scheduler
+import metrics
+from invoice_records import InvoiceRecord
+from invoice_analytics import (rollup_invoices, combine_rollups, add_month_over_month,
+                               rollup_to_records, team_totals, is_closed_month,
+                               month_totals, rollup_from_month_totals, within_one_month)
+from report_jobs import ReportJobManager, ReportJobError, DONE
+from sessions import SessionStore
+from team_index import TeamIndex
+from ttl_cache import TTLCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for React frontend
+CORS(app, expose_headers=['ETag', 'Last-Modified'])  # Enable CORS for React frontend
 
-# Nexudus API base URL for CoMotion workspace management
-BASE_URL = 'https://spaces.nexudus.com/api/'
+# Maximum number of invoice date-range queries sent to Nexudus at the same time
+INVOICE_FETCH_CONCURRENCY = int(os.environ.get('INVOICE_FETCH_CONCURRENCY', 6))
+
+# Number of invoices requested per billing/invoices page
+INVOICE_PAGE_SIZE = int(os.environ.get('INVOICE_PAGE_SIZE', 100))
+
+# Pages buffered per date range while a streamed report is still reading earlier ranges
+INVOICE_STREAM_BUFFER_PAGES = 1
+
+# Queued by a streaming range worker once its last page has been delivered
+RANGE_DONE = object()
+
+# Local SQLite invoice mirror (disabled unless INVOICE_MIRROR_DB is set)
+mirror = invoice_mirror.InvoiceMirror(invoice_mirror.MIRROR_DB_PATH) if invoice_mirror.MIRROR_DB_PATH else None
+
+# Accepted values for the "freshness" request field
+FRESHNESS_OPTIONS = ('mirror', 'live')
+
+# Invoice fields included in reports, mapped to their column headers
+# (keys follow the invoice_records.INVOICE_FIELDS order)
+INVOICE_COLUMN_MAPPING = {
+    'RecordID': 'Invoice ID',
+    'Invoice_BillToName': 'Company Name',
+    'Invoice_InvoiceFromDate': 'Invoice From Date',
+    'Invoice_InvoiceToDate': 'Invoice To Date',
+    'Invoice_TotalGrossAmount': 'Gross Amount',
+    'Invoice_Reference': 'Reference'
+}
+
+# Directory for XlsxWriter's constant_memory row files (system default when unset)
+EXCEL_TMPDIR = os.environ.get('EXCEL_TMPDIR') or None
+
+# Worker pool size and team limit for /generate_excel_batch
+BATCH_REPORT_WORKERS = int(os.environ.get('BATCH_REPORT_WORKERS', 4))
+BATCH_MAX_TEAMS = int(os.environ.get('BATCH_MAX_TEAMS', 500))
+
+# Accepted values for the batch "output" request field
+BATCH_OUTPUT_OPTIONS = ('zip', 'sheets')
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Signed login sessions mapping tokens to verified upstream credentials
+session_store = SessionStore(os.environ.get('SECRET_KEY'))
+
+# Background queue for long-running reports (/report_jobs)
+report_jobs = ReportJobManager()
+
+# Per-month rollups of closed months (which never change), keyed per credential
+rollup_cache = TTLCache(maxsize=int(os.environ.get('ROLLUP_CACHE_MAXSIZE', 10000)),
+                        ttl=int(os.environ.get('ROLLUP_CACHE_TTL_SECONDS', 86400)),
+                        name='rollups')
+
+# Team lists cached per credential (the frontend asks on every page load)
+teams_cache = TTLCache(maxsize=int(os.environ.get('TEAMS_CACHE_MAXSIZE', 256)),
+                       ttl=int(os.environ.get('TEAMS_CACHE_TTL_SECONDS', 300)),
+                       name='teams')
+
+# Whether a credential may read the mirror (checked against the sync account's catalogue)
+mirror_access_cache = TTLCache(maxsize=int(os.environ.get('MIRROR_ACCESS_CACHE_MAXSIZE', 1024)),
+                               ttl=int(os.environ.get('MIRROR_ACCESS_TTL_SECONDS', 300)),
+                               name='mirror_access')
+
+# Accounts allowed to read the mirror (any account of the sync business when empty)
+MIRROR_ALLOWED_USERS = {email.strip().casefold()
+                        for email in os.environ.get('MIRROR_ALLOWED_USERS', '').split(',')
+                        if email.strip()}
+
+# Page size used when crawling the full team catalogue
+TEAM_PAGE_SIZE = int(os.environ.get('TEAM_PAGE_SIZE', 100))
+
+# Largest page of type-ahead matches returned by /search_teams
+TEAM_SEARCH_MAX_PAGE_SIZE = 100
 
 def encode_auth(username, password):
     """
@@ -44,7 +137,56 @@ def encode_auth(username, password):
     base64_credentials = base64.b64encode(credentials.encode()).decode()
     return f"Basic {base64_credentials}"
 
+def credential_key(headers):
+    """
+    Derive a cache key from authorization headers without keeping the secret.
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        
+    Returns:
+        str: SHA-256 hex digest of the Authorization header
+    """
+    return hashlib.sha256(headers['Authorization'].encode()).hexdigest()
+
+@app.before_request
+def start_request_metrics():
+    """Track in-flight requests and remember when this request started."""
+    g.request_started = time.perf_counter()
+    metrics.REQUESTS_IN_FLIGHT.inc()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record endpoint latency once the response is ready."""
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.REQUESTS_IN_FLIGHT.dec()
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.REQUEST_LATENCY.labels(endpoint=endpoint, method=request.method,
+                                       status=response.status_code).observe(
+            time.perf_counter() - started)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    """Release the in-flight slot of requests that failed before a response."""
+    if g.pop('request_started', None) is not None:
+        metrics.REQUESTS_IN_FLIGHT.dec()
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Expose Prometheus metrics (endpoint and Nexudus latency, retries,
+    timeouts, cache hit rates, report build time and size).
+    
+    Returns:
+        Metrics in the Prometheus text exposition format
+    """
+    body, content_type = metrics.render_latest()
+    return body, 200, {'Content-Type': content_type}
+
 @app.route('/login', methods=['POST'])
+@metrics.timed('login')
 def login():
     """
     Authenticate user credentials against Nexudus API.
@@ -56,7 +198,8 @@ def login():
         }
     
     Returns:
-        JSON response with success/error message and HTTP status code
+        JSON response with success/error message and, on success, a
+        short-lived session token to send as "Authorization: Bearer <token>"
     """
     try:
         username = request.json.get('email')
@@ -71,14 +214,18 @@ def login():
         headers = {'Authorization': encode_auth(username, password)}
         
         # Test authentication by making a simple API call
-        response = requests.get(f'{BASE_URL}spaces/teams', 
-                              headers=headers, 
-                              params={'page': 1, 'size': 1},
-                              timeout=10)
+        response = nexudus_client.get('spaces/teams',
+                                      headers=headers,
+                                      params={'page': 1, 'size': 1})
         
         if response.ok:
             logger.info(f"Successful login for user: {username}")
-            return jsonify({'message': 'Login successful'}), 200
+            token = session_store.create(username, headers['Authorization'], credential_key(headers))
+            return jsonify({
+                'message': 'Login successful',
+                'token': token,
+                'expires_in': session_store.ttl
+            }), 200
         else:
             logger.warning(f"Failed login attempt for user: {username}")
             return jsonify({'error': 'Invalid credentials'}), 401
@@ -91,50 +238,116 @@ def login():
         logger.error(f"Login error: {str(e)}")
         return jsonify({'error': 'An unexpected error occurred during login.'}), 500
 
+@app.route('/logout', methods=['POST'])
+def logout():
+    """
+    End the session behind the request's bearer token.
+    
+    Expected headers:
+        Authorization: Bearer <session token from /login>
+    
+    Returns:
+        JSON response confirming the logout
+    """
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        session_store.revoke(auth[len('Bearer '):].strip())
+    return jsonify({'message': 'Logged out'}), 200
+
 @app.route('/get_teams', methods=['GET'])
 def get_teams():
     """
     Retrieve all teams/companies from the CoMotion Nexudus workspace.
     
+    The full catalogue is crawled across every Nexudus page and cached
+    in-process per credential. Responses carry
+    ETag/Last-Modified headers, so a browser revalidating with
+    If-None-Match or If-Modified-Since gets an empty 304 instead of the list.
+    
     Expected headers:
-        username: User's email/username
-        password: User's password
+        Authorization: Bearer <session token from /login>
+        (or, for older clients, username/password headers)
+    
+    Query parameters:
+        refresh: "true" drops the cached list and fetches it again
     
     Returns:
         JSON response containing list of teams with their details
     """
     try:
-        username = request.headers.get('username')
-        password = request.headers.get('password')
+        # Resolve the session token (or raw credentials) to upstream headers
+        headers, error_response = resolve_auth_headers()
+        if headers is None:
+            return error_response
         
-        # Validate credentials
-        is_valid, error_msg = validate_credentials(username, password)
-        if not is_valid:
-            return jsonify({'error': error_msg}), 400
+        refresh = request.args.get('refresh', '').lower() == 'true'
+        success, result = fetch_teams(headers, refresh=refresh)
+        if not success:
+            return jsonify({'error': 'Failed to retrieve teams'}), result
         
-        # Create authorization header for API request
-        headers = {'Authorization': encode_auth(username, password)}
+        response = jsonify(result['data'])
+        response.set_etag(result['etag'])
+        response.last_modified = result['last_modified']
+        # Browsers may keep the list but must revalidate; it differs per user
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.update(['Authorization', 'username', 'password'])
+        return response.make_conditional(request)
+            
+    except requests.exceptions.Timeout:
+        return jsonify({'error': 'Connection timeout. Please try again.'}), 500
+    except requests.exceptions.ConnectionError:
+        return jsonify({'error': 'Unable to connect to the service.'}), 500
+    except Exception as e:
+        logger.error(f"Get teams error: {str(e)}")
+        return jsonify({'error': 'An unexpected error occurred.'}), 500
+
+@app.route('/search_teams', methods=['GET'])
+def search_teams():
+    """
+    Type-ahead search over the cached team catalogue.
+    
+    Matches are case-insensitive prefixes of any word in a team name, with
+    teams whose name starts with the query listed first. Lookups are served
+    from an in-memory prefix index, so the browser no longer needs the
+    whole list.
+    
+    Expected headers:
+        Authorization: Bearer <session token from /login>
+    
+    Query parameters:
+        q: Typed prefix (empty lists every team)
+        page: 1-based results page (default 1)
+        size: Results per page (default 20, at most 100)
+    
+    Returns:
+        JSON response with matching teams (RecordID, TeamName) and paging fields
+    """
+    try:
+        headers, error_response = resolve_auth_headers()
+        if headers is None:
+            return error_response
         
-        # Fetch teams with pagination (up to 100 teams, sorted ascending)
-        response = requests.get(f'{BASE_URL}spaces/teams', 
-                              headers=headers,
-                              params={'page': 1, 'size': 100, 'dir': 'Ascending'},
-                              timeout=10)
+        page = request.args.get('page', 1, type=int)
+        size = request.args.get('size', 20, type=int)
+        if page < 1 or not 1 <= size <= TEAM_SEARCH_MAX_PAGE_SIZE:
+            return jsonify({'error': f'page must be at least 1 and size between 1 and '
+                                     f'{TEAM_SEARCH_MAX_PAGE_SIZE}'}), 400
         
-        if response.ok:
-            teams_data = response.json()
-            logger.info(f"Retrieved {len(teams_data.get('Records', []))} teams")
-            return jsonify(teams_data), 200
-        else:
-            logger.error(f"Failed to retrieve teams: {response.status_code}")
-            return jsonify({'error': 'Failed to retrieve teams'}), response.status_code
+        success, result = fetch_teams(headers)
+        if not success:
+            return jsonify({'error': 'Failed to retrieve teams'}), result
+        
+        query = request.args.get('q', '')
+        response = jsonify(dict(result['index'].search(query, page, size), query=query))
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
             
     except requests.exceptions.Timeout:
         return jsonify({'error': 'Connection timeout. Please try again.'}), 500
     except requests.exceptions.ConnectionError:
         return jsonify({'error': 'Unable to connect to the service.'}), 500
     except Exception as e:
-        logger.error(f"Get teams error: {str(e)}")
+        logger.error(f"Search teams error: {str(e)}")
         return jsonify({'error': 'An unexpected error occurred.'}), 500
 
 @app.route('/get_invoices', methods=['POST'])
@@ -144,41 +357,44 @@ def get_invoices():
     
     Expected JSON payload:
         {
-            "email": "user@example.com",
-            "password": "userpassword",
+            "email": "user@example.com",      # omit both when sending
+            "password": "userpassword",       # "Authorization: Bearer <token>"
             "team_name": "Startup Company Name",
             "months": [
                 {"month": 1, "year": 2023},
                 {"month": 2, "year": 2023}
-            ]
+            ],
+            "freshness": "mirror"   # optional: "live" skips the local mirror
         }
     
     Returns:
         JSON response with all invoices found for the specified periods
+        (report fields only, see invoice_records.INVOICE_FIELDS)
     """
-    username = request.json.get('email')
-    password = request.json.get('password')
     team_name = request.json.get('team_name')
     months = request.json.get('months')
+    freshness = request.json.get('freshness', 'mirror')
 
-    headers = {'Authorization': encode_auth(username, password)}
-
-    # Validate credentials format
-    is_valid, error_message = validate_credentials(username, password)
-    if not is_valid:
-        return jsonify({'error': error_message}), 400
+    # Resolve the session token (or raw credentials) to upstream headers
+    headers, error_response = resolve_auth_headers()
+    if headers is None:
+        return error_response
 
     # Validate month/year inputs
     is_valid, error_message = validate_date_inputs(months)
     if not is_valid:
         return jsonify({'error': error_message}), 400
 
+    if freshness not in FRESHNESS_OPTIONS:
+        return jsonify({'error': "Freshness must be 'mirror' or 'live'"}), 400
+
     # Fetch invoices for the specified periods
-    success, result = fetch_invoices_for_periods(headers, team_name, months)
+    success, result = load_invoices(headers, team_name, months, freshness)
     if not success:
         return jsonify({'error': result}), 400
 
-    return jsonify({'message': 'Invoices retrieved successfully', 'data': result}), 200
+    return jsonify({'message': 'Invoices retrieved successfully',
+                    'data': [invoice.to_dict() for invoice in result]}), 200
 
 @app.route('/generate_excel', methods=['POST'])
 def generate_excel():
@@ -186,32 +402,36 @@ def generate_excel():
     Generate and download an Excel file containing invoice data for specified periods.
     
     This endpoint fetches invoice data (similar to /get_invoices) and formats it
-    into an Excel spreadsheet for download.
+    into an Excel spreadsheet for download. Rows are written page by page with
+    XlsxWriter's constant_memory mode into a temporary file, which is then sent
+    to the client in chunks, so memory use does not grow with report size.
     
     Expected JSON payload:
         {
-            "email": "user@example.com",
-            "password": "userpassword", 
+            "email": "user@example.com",      # omit both when sending
+            "password": "userpassword",       # "Authorization: Bearer <token>"
             "team_name": "Startup Company Name",
             "months": [
                 {"month": 1, "year": 2023},
                 {"month": 2, "year": 2023}
-            ]
+            ],
+            "freshness": "mirror",      # optional: "live" skips the local mirror
+            "include_summary": false    # optional: add a per-month "Summary" sheet
         }
     
     Returns:
         Excel file as attachment download
     """
     try:
-        username = request.json.get('email')
-        password = request.json.get('password')
         team_name = request.json.get('team_name')
         months = request.json.get('months')
+        freshness = request.json.get('freshness', 'mirror')
+        include_summary = bool(request.json.get('include_summary', False))
 
-        # Validate credentials
-        is_valid, error_msg = validate_credentials(username, password)
-        if not is_valid:
-            return jsonify({'error': error_msg}), 400
+        # Resolve the session token (or raw credentials) to upstream headers
+        headers, error_response = resolve_auth_headers()
+        if headers is None:
+            return error_response
         
         # Validate team name
         if not team_name:
@@ -222,198 +442,719 @@ def generate_excel():
         if not is_valid:
             return jsonify({'error': error_msg}), 400
 
-        headers = {'Authorization': encode_auth(username, password)}
+        if freshness not in FRESHNESS_OPTIONS:
+            return jsonify({'error': "Freshness must be 'mirror' or 'live'"}), 400
 
-        # Fetch invoice data using shared function
-        success, result = fetch_invoices_for_periods(headers, team_name, months)
-        if not success:
-            return jsonify({'error': result}), 500
+        # Stream invoice pages straight into a constant_memory workbook on disk
+        output = tempfile.TemporaryFile(dir=EXCEL_TMPDIR)
+        try:
+            with metrics.time_stage('excel_build'):
+                row_count = write_invoice_workbook(
+                    output, iter_invoices_for_periods(headers, team_name, months, freshness),
+                    include_summary=include_summary)
+        except BaseException:
+            output.close()
+            raise
 
-        if not result:
+        if row_count == 0:
+            output.close()
             return jsonify({'error': 'No invoices found for the selected periods'}), 404
 
-        # Convert invoice data to pandas DataFrame for Excel processing
-        df = pd.DataFrame(result)
-        
-        # Select and rename relevant columns for better readability
-        if not df.empty:
-            column_mapping = {
-                'RecordID': 'Invoice ID',
-                'Invoice_BillToName': 'Company Name',
-                'Invoice_InvoiceFromDate': 'Invoice From Date',
-                'Invoice_InvoiceToDate': 'Invoice To Date',
-                'Invoice_TotalGrossAmount': 'Gross Amount',
-                'Invoice_Reference': 'Reference'
-            }
-            
-            # Select only available columns
-            available_columns = [col for col in column_mapping.keys() if col in df.columns]
-            df_selected = df[available_columns].copy()
-            df_selected.rename(columns=column_mapping, inplace=True)
-        
-        # Create Excel file in memory with improved formatting
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df_selected.to_excel(writer, index=False, sheet_name='Invoice Report')
-            
-            # Get workbook and worksheet for formatting
-            workbook = writer.book
-            worksheet = writer.sheets['Invoice Report']
-            
-            # Add formatting
-            header_format = workbook.add_format({
-                'bold': True,
-                'text_wrap': True,
-                'valign': 'top',
-                'fg_color': '#D7E4BC',
-                'border': 1
-            })
-            
-            # Apply header formatting
-            for col_num, value in enumerate(df_selected.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-                worksheet.set_column(col_num, col_num, 15)  # Set column width
-        
-        output.seek(0)  # Reset buffer position to beginning
+        output.seek(0)  # Reset file position to beginning
         
         # Generate filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"invoices_{team_name}_{timestamp}.xlsx"
         
-        logger.info(f"Generated Excel file for {team_name} with {len(result)} invoices")
+        logger.info(f"Generated Excel file for {team_name} with {row_count} invoices")
         
-        # Return Excel file as downloadable attachment
-        return send_file(
-            output, 
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        # Return Excel file as downloadable attachment (sent in chunks, closed afterwards)
+        return send_report_file(output, filename, XLSX_MIMETYPE)
         
+    except nexudus_client.NexudusAPIError as e:
+        return jsonify({'error': str(e)}), 500
+    except requests.exceptions.Timeout:
+        return jsonify({'error': 'Request timed out. Please try again.'}), 500
+    except requests.exceptions.ConnectionError:
+        return jsonify({'error': 'Unable to connect to the API. Please check your internet connection.'}), 500
     except Exception as e:
         logger.error(f"Excel generation error: {str(e)}")
         return jsonify({'error': 'An unexpected error occurred while generating the Excel file.'}), 500
 
-def validate_credentials(username, password):
+@app.route('/export_invoices', methods=['POST'])
+def export_invoices():
     """
-    Validate that credentials are provided and properly formatted.
+    Stream invoice data for specified periods as NDJSON, CSV or Parquet.
     
-    Args:
-        username (str): User's email/username
-        password (str): User's password
-        
-    Returns:
-        tuple: (is_valid: bool, error_message: str)
-    """
-    if not username or not password:
-        return False, "Email and password are required"
+    Meant for downstream tooling that reads the data programmatically.
+    Rows are encoded page by page as invoices arrive, using the same column
+    names as the Excel report. NDJSON and CSV are compressed with Brotli or
+    gzip when the client's Accept-Encoding allows it.
     
-    if '@' not in username:
-        return False, "Please provide a valid email address"
+    Expected JSON payload:
+        {
+            "team_name": "Startup Company Name",
+            "months": [
+                {"month": 1, "year": 2023},
+                {"month": 2, "year": 2023}
+            ],
+            "format": "csv",          # "ndjson", "csv" or "parquet"
+            "freshness": "mirror"     # optional: "live" skips the local mirror
+        }
     
-    return True, ""
+    Returns:
+        Streamed file as attachment download
+    """
+    try:
+        team_name = request.json.get('team_name')
+        months = request.json.get('months')
+        freshness = request.json.get('freshness', 'mirror')
+        export_format = request.json.get('format')
 
-def validate_date_inputs(months):
+        # Resolve the session token (or raw credentials) to upstream headers
+        headers, error_response = resolve_auth_headers()
+        if headers is None:
+            return error_response
+        
+        if not team_name:
+            return jsonify({'error': 'Team name is required'}), 400
+
+        is_valid, error_msg = validate_date_inputs(months)
+        if not is_valid:
+            return jsonify({'error': error_msg}), 400
+
+        if freshness not in FRESHNESS_OPTIONS:
+            return jsonify({'error': "Freshness must be 'mirror' or 'live'"}), 400
+
+        if export_format not in invoice_export.EXPORT_FORMATS:
+            return jsonify({'error': 'Format must be one of: ' +
+                                     ', '.join(invoice_export.EXPORT_FORMATS)}), 400
+        invoice_export.check_available(export_format)
+
+        # Read up to the first invoices before committing to a 200, so
+        # upstream and credential errors still get a JSON error response
+        # Bulk exports queue behind interactive report requests upstream
+        pages = iter_invoices_for_periods(headers, team_name, months, freshness,
+                                          upstream_scheduler.BATCH)
+        first_page = next((records for records in pages if records), None)
+        if first_page is None:
+            return jsonify({'error': 'No invoices found for the selected periods'}), 404
+
+        encoding = invoice_export.negotiate_encoding(request.accept_encodings, export_format)
+        mimetype, extension = invoice_export.EXPORT_FORMATS[export_format]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"invoices_{team_name}_{timestamp}.{extension}"
+
+        body = invoice_export.iter_export(chain([first_page], pages), export_format,
+                                          INVOICE_COLUMN_MAPPING, encoding)
+        response = Response(stream_export(body, export_format, team_name), mimetype=mimetype)
+        response.headers.set('Content-Disposition', 'attachment', filename=filename)
+        if encoding:
+            response.content_encoding = encoding
+        response.vary.add('Accept-Encoding')
+        logger.info(f"Streaming {export_format} export for {team_name} ({encoding or 'identity'})")
+        return response
+        
+    except invoice_export.ExportFormatUnavailable as e:
+        return jsonify({'error': str(e)}), 501
+    except nexudus_client.NexudusAPIError as e:
+        return jsonify({'error': str(e)}), 500
+    except requests.exceptions.Timeout:
+        return jsonify({'error': 'Request timed out. Please try again.'}), 500
+    except requests.exceptions.ConnectionError:
+        return jsonify({'error': 'Unable to connect to the API. Please check your internet connection.'}), 500
+    except Exception as e:
+        logger.error(f"Export error: {str(e)}")
+        return jsonify({'error': 'An unexpected error occurred while exporting invoices.'}), 500
+
+def stream_export(body, export_format, team_name):
     """
-    Validate month/year inputs for invoice requests.
+    Pass export chunks through to the client, recording the bytes sent.
+    
+    Once streaming has started the status code can no longer change, so a
+    failure part-way is logged and re-raised: the server then drops the
+    connection without the terminating chunk and the client sees an
+    incomplete transfer instead of a short but well-formed file.
     
     Args:
-        months (list): List of month/year dictionaries
+        body (iterable): Response body chunks
+        export_format (str): Export format name (metric label)
+        team_name (str): Name of the team/company (for logging)
         
+    Yields:
+        bytes: Response body chunks
+    """
+    sent = 0
+    try:
+        for chunk in body:
+            sent += len(chunk)
+            yield chunk
+    except Exception as e:
+        logger.error(f"Export of {team_name} stopped after {sent} bytes: {str(e)}")
+        raise
+    metrics.EXCEL_BYTES.labels(kind=export_format).observe(sent)
+
+@app.route('/generate_excel_batch', methods=['POST'])
+def generate_excel_batch():
+    """
+    Generate invoice reports for many teams in one request.
+    
+    Each team's report is fetched and rendered on a worker pool. A team that
+    fails or has no invoices is recorded in the batch summary instead of
+    failing the whole batch.
+    
+    Expected JSON payload:
+        {
+            "email": "user@example.com",      # omit both when sending
+            "password": "userpassword",       # "Authorization: Bearer <token>"
+            "team_names": ["Startup A", "Startup B"],   # or "all"
+            "months": [
+                {"month": 1, "year": 2023}
+            ],
+            "output": "zip",        # optional: "zip" (one workbook per team) or "sheets"
+            "freshness": "mirror"   # optional: "live" skips the local mirror
+        }
+    
     Returns:
-        tuple: (is_valid: bool, error_message: str)
+        ZIP archive of workbooks plus batch_summary.json, or a single workbook
+        with a "Batch Summary" sheet followed by one sheet per team
     """
-    if not months or len(months) == 0:
-        return False, "At least one month/year selection is required"
+    try:
+        team_names = request.json.get('team_names')
+        months = request.json.get('months')
+        output_format = request.json.get('output', 'zip')
+        freshness = request.json.get('freshness', 'mirror')
+
+        # Resolve the session token (or raw credentials) to upstream headers
+        headers, error_response = resolve_auth_headers()
+        if headers is None:
+            return error_response
+
+        # Validate date inputs
+        is_valid, error_msg = validate_date_inputs(months)
+        if not is_valid:
+            return jsonify({'error': error_msg}), 400
+
+        if output_format not in BATCH_OUTPUT_OPTIONS:
+            return jsonify({'error': "Output must be 'zip' or 'sheets'"}), 400
+
+        if freshness not in FRESHNESS_OPTIONS:
+            return jsonify({'error': "Freshness must be 'mirror' or 'live'"}), 400
+
+        # Expand "all" into every team visible to the caller
+        if team_names == 'all':
+            success, result = fetch_teams(headers)
+            if not success:
+                return jsonify({'error': 'Failed to retrieve teams'}), result
+            team_names = [team.get('TeamName') for team in result['data'].get('Records', [])
+                          if team.get('TeamName')]
+
+        is_valid, error_msg = validate_team_names(team_names)
+        if not is_valid:
+            return jsonify({'error': error_msg}), 400
+
+        if output_format == 'zip':
+            output, summary = build_batch_zip(headers, team_names, months, freshness)
+            extension, mimetype = 'zip', 'application/zip'
+        else:
+            output, summary = build_batch_workbook(headers, team_names, months, freshness)
+            extension, mimetype = 'xlsx', XLSX_MIMETYPE
+
+        if not any(entry['status'] == 'ok' for entry in summary):
+            output.close()
+            return jsonify({'error': 'No reports could be generated for the selected teams',
+                            'summary': summary}), 404
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"invoices_batch_{timestamp}.{extension}"
+        
+        logger.info(f"Generated batch report for {len(team_names)} teams "
+                    f"({sum(entry['status'] == 'ok' for entry in summary)} with invoices)")
+        
+        return send_report_file(output, filename, mimetype)
+
+    except Exception as e:
+        logger.error(f"Batch report error: {str(e)}")
+        return jsonify({'error': 'An unexpected error occurred while generating the batch report.'}), 500
+
+@app.route('/report_jobs', methods=['POST'])
+def submit_report_job():
+    """
+    Queue an Excel report to be built in the background.
     
-    for date in months:
-        month = date.get('month')
-        year = date.get('year')
+    Identical reports (same user, team, months and freshness) that are still
+    queued or running are shared: the existing job id is returned.
+    
+    Expected JSON payload:
+        Same as /generate_excel
+    
+    Returns:
+        202 JSON response with the job id and status URL
+    """
+    try:
+        team_name = request.json.get('team_name')
+        months = request.json.get('months')
+        freshness = request.json.get('freshness', 'mirror')
+
+        # Resolve the session token (or raw credentials) to upstream headers
+        headers, error_response = resolve_auth_headers()
+        if headers is None:
+            return error_response
         
-        # Check if month and year are provided
-        if not month or not year:
-            return False, "All month and year fields must be filled"
+        # Validate team name
+        if not team_name:
+            return jsonify({'error': 'Team name is required'}), 400
+
+        # Validate date inputs
+        is_valid, error_msg = validate_date_inputs(months)
+        if not is_valid:
+            return jsonify({'error': error_msg}), 400
+
+        if freshness not in FRESHNESS_OPTIONS:
+            return jsonify({'error': "Freshness must be 'mirror' or 'live'"}), 400
+
+        periods = tuple(sorted({(int(date['year']), int(date['month'])) for date in months}))
         
-        # Validate month range
-        try:
-            month_int = int(month)
-            if month_int < 1 or month_int > 12:
-                return False, "Month must be between 1 and 12"
-        except (ValueError, TypeError):
-            return False, "Month must be a valid number"
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        job, created = report_jobs.submit(
+            credential_key(headers),
+            (team_name, periods, freshness),
+            f"invoices_{team_name}_{timestamp}.xlsx",
+            lambda job: run_report_job(job, headers, team_name, months, freshness)
+        )
         
-        # Validate year range
-        try:
-            year_int = int(year)
-            current_year = datetime.now().year
-            if year_int < 2020 or year_int > current_year + 1:
-                return False, f"Year must be between 2020 and {current_year + 1}"
-        except (ValueError, TypeError):
-            return False, "Year must be a valid number"
-    
-    return True, ""
+        response = jsonify({
+            'message': 'Report job queued' if created else 'Joined identical report job in progress',
+            'job_id': job.job_id,
+            'status': job.status,
+            'status_url': f"/report_jobs/{job.job_id}"
+        })
+        response.headers['Location'] = f"/report_jobs/{job.job_id}"
+        return response, 202
 
-def get_month_date_range(month, year):
+    except Exception as e:
+        logger.error(f"Report job submission error: {str(e)}")
+        return jsonify({'error': 'An unexpected error occurred while queuing the report.'}), 500
+
+@app.route('/report_jobs/<job_id>', methods=['GET'])
+def get_report_job(job_id):
     """
-    Get the start and end dates for a given month/year.
+    Report the status and progress of a background report job.
+    
+    Expected headers:
+        Authorization: Bearer <session token from /login>
+        (or, for older clients, username/password headers)
     
-    Args:
-        month (int): Month (1-12)
-        year (int): Year
-        
     Returns:
-        tuple: (start_date: str, end_date: str) in YYYY-MM-DD format
+        JSON response with job status, progress and expiry
     """
-    # Get the last day of the month to handle varying month lengths
-    last_day = calendar.monthrange(year, month)[1]
-    start_date = f"{year}-{month:02d}-01"
-    end_date = f"{year}-{month:02d}-{last_day}"
-    return start_date, end_date
+    job, error_response = lookup_report_job(job_id)
+    if job is None:
+        return error_response
+    return jsonify(job.to_dict()), 200
 
-def fetch_invoices_for_periods(headers, team_name, months):
+@app.route('/report_jobs/<job_id>/download', methods=['GET'])
+def download_report_job(job_id):
     """
-    Fetch invoices for multiple time periods (shared between endpoints).
+    Download the Excel file of a finished report job.
+    
+    Expected headers:
+        Authorization: Bearer <session token from /login>
+        (or, for older clients, username/password headers)
     
-    Args:
-        headers (dict): Authorization headers for API requests
-        team_name (str): Name of the team/company
-        months (list): List of month/year dictionaries
-        
     Returns:
-        tuple: (success: bool, data: list or error_message: str)
+        Excel file as attachment download, or 409 while the job is unfinished
     """
-    all_invoices = []
+    job, error_response = lookup_report_job(job_id)
+    if job is None:
+        return error_response
+    
+    if job.status != DONE:
+        return jsonify({'error': f"Report is not ready (status: {job.status})",
+                        'status': job.status, 'report_error': job.error}), 409
     
     try:
-        for date in months:
-            month = int(date['month'])
-            year = int(date['year'])
-            
-            start_date, end_date = get_month_date_range(month, year)
-            
-            # Build API URL with filters for team name and date range
-            url = f"{BASE_URL}billing/invoices"
-            params = {
-                'page': 1,
-                'size': 25,
-                'Invoice_BillToName': team_name,
-                f'from_Invoice_InvoiceFromDate': f"{start_date}T00:00:00",
-                f'to_Invoice_InvoiceToDate': f"{end_date}T23:59:59"
+        output = open(job.result_path, 'rb')
+    except FileNotFoundError:
+        return jsonify({'error': 'Report has expired'}), 404
+    
+    return send_report_file(output, job.filename, XLSX_MIMETYPE)
+
+@app.route('/invoice_summary', methods=['POST'])
+def invoice_summary():
+    """
+    Summarise gross invoice amounts per team per month.
+    
+    Totals and counts are computed server-side with pandas, along with
+    month-over-month changes. Rollups of closed months are cached.
+    
+    Expected JSON payload:
+        {
+            "email": "user@example.com",      # omit both when sending
+            "password": "userpassword",       # "Authorization: Bearer <token>"
+            "team_names": ["Startup A", "Startup B"],   # or "all", or "team_name": "..."
+            "months": [
+                {"month": 1, "year": 2023},
+                {"month": 2, "year": 2023}
+            ],
+            "freshness": "mirror"   # optional: "live" skips the local mirror
+        }
+    
+    Returns:
+        JSON response with per-month rows, per-team totals, grand totals and
+        any per-team errors
+    """
+    try:
+        team_names = request.json.get('team_names')
+        months = request.json.get('months')
+        freshness = request.json.get('freshness', 'mirror')
+        
+        if team_names is None and request.json.get('team_name'):
+            team_names = [request.json.get('team_name')]
+
+        # Resolve the session token (or raw credentials) to upstream headers
+        headers, error_response = resolve_auth_headers()
+        if headers is None:
+            return error_response
+
+        # Validate date inputs
+        is_valid, error_msg = validate_date_inputs(months)
+        if not is_valid:
+            return jsonify({'error': error_msg}), 400
+
+        if freshness not in FRESHNESS_OPTIONS:
+            return jsonify({'error': "Freshness must be 'mirror' or 'live'"}), 400
+
+        # Expand "all" into every team visible to the caller
+        summarise_all = team_names == 'all'
+        if summarise_all:
+            success, result = fetch_teams(headers)
+            if not success:
+                return jsonify({'error': 'Failed to retrieve teams'}), result
+            team_names = [team.get('TeamName') for team in result['data'].get('Records', [])
+                          if team.get('TeamName')]
+
+        is_valid, error_msg = validate_team_names(team_names)
+        if not is_valid:
+            return jsonify({'error': error_msg}), 400
+
+        # Team lists and "all" are batch work and queue behind interactive calls
+        if len(team_names) > 1 or summarise_all:
+            priority = upstream_scheduler.BATCH
+        else:
+            priority = upstream_scheduler.INTERACTIVE
+
+        frames = []
+        errors = []
+        for idx, (success, result) in run_batch(rollup_team_months, team_names,
+                                                headers, months, freshness, priority):
+            if success:
+                frames.append(result)
+            else:
+                errors.append({'team_name': team_names[idx], 'error': result})
+
+        if not frames:
+            return jsonify({'error': 'Failed to summarise invoices', 'errors': errors}), 502
+
+        rollup = add_month_over_month(combine_rollups(frames))
+        
+        return jsonify({
+            'message': 'Invoice summary computed successfully',
+            'summary': rollup_to_records(rollup),
+            'team_totals': team_totals(rollup),
+            'totals': {
+                'total_gross': float(rollup['total_gross'].sum()),
+                'invoice_count': int(rollup['invoice_count'].sum())
+            },
+            'errors': errors
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Invoice summary error: {str(e)}")
+        return jsonify({'error': 'An unexpected error occurred while summarising invoices.'}), 500
+
+def resolve_auth_headers():
+    """
+    Work out the upstream Authorization header for the current request.
+    
+    A bearer session token from /login is checked locally and mapped to the
+    cached upstream credentials. Requests without a token fall back to raw
+    credentials: email/password in the JSON body, or username/password headers.
+    
+    Returns:
+        tuple: (headers: dict or None, error_response: tuple or None)
+    """
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        session = session_store.resolve(auth[len('Bearer '):].strip())
+        if session is None:
+            return None, (jsonify({'error': 'Session expired or invalid. Please log in again.'}), 401)
+        return {'Authorization': session['authorization']}, None
+    
+    body = request.get_json(silent=True) or {}
+    username = body.get('email') or request.headers.get('username')
+    password = body.get('password') or request.headers.get('password')
+    
+    # Validate credentials
+    is_valid, error_msg = validate_credentials(username, password)
+    if not is_valid:
+        return None, (jsonify({'error': error_msg}), 400)
+    
+    return {'Authorization': encode_auth(username, password)}, None
+
+def validate_credentials(username, password):
+    """
+    Validate that credentials are provided and properly formatted.
+    
+    Args:
+        username (str): User's email/username
+        password (str): User's password
+        
+    Returns:
+        tuple: (is_valid: bool, error_message: str)
+    """
+    if not username or not password:
+        return False, "Email and password are required"
+    
+    if '@' not in username:
+        return False, "Please provide a valid email address"
+    
+    return True, ""
+
+def validate_team_names(team_names):
+    """
+    Validate the team list of a batch report request.
+    
+    Args:
+        team_names (list): Team/company names
+        
+    Returns:
+        tuple: (is_valid: bool, error_message: str)
+    """
+    if not isinstance(team_names, list) or len(team_names) == 0:
+        return False, "Provide a list of team names or \"all\""
+    
+    if not all(isinstance(name, str) and name for name in team_names):
+        return False, "Team names must be non-empty strings"
+    
+    if len(team_names) > BATCH_MAX_TEAMS:
+        return False, f"A batch can include at most {BATCH_MAX_TEAMS} teams"
+    
+    return True, ""
+
+def validate_date_inputs(months):
+    """
+    Validate month/year inputs for invoice requests.
+    
+    Args:
+        months (list): List of month/year dictionaries
+        
+    Returns:
+        tuple: (is_valid: bool, error_message: str)
+    """
+    if not months or len(months) == 0:
+        return False, "At least one month/year selection is required"
+    
+    for date in months:
+        month = date.get('month')
+        year = date.get('year')
+        
+        # Check if month and year are provided
+        if not month or not year:
+            return False, "All month and year fields must be filled"
+        
+        # Validate month range
+        try:
+            month_int = int(month)
+            if month_int < 1 or month_int > 12:
+                return False, "Month must be between 1 and 12"
+        except (ValueError, TypeError):
+            return False, "Month must be a valid number"
+        
+        # Validate year range
+        try:
+            year_int = int(year)
+            current_year = datetime.now().year
+            if year_int < 2020 or year_int > current_year + 1:
+                return False, f"Year must be between 2020 and {current_year + 1}"
+        except (ValueError, TypeError):
+            return False, "Year must be a valid number"
+    
+    return True, ""
+
+def get_month_date_range(month, year):
+    """
+    Get the start and end dates for a given month/year.
+    
+    Args:
+        month (int): Month (1-12)
+        year (int): Year
+        
+    Returns:
+        tuple: (start_date: str, end_date: str) in YYYY-MM-DD format
+    """
+    # Get the last day of the month to handle varying month lengths
+    last_day = calendar.monthrange(year, month)[1]
+    start_date = f"{year}-{month:02d}-01"
+    end_date = f"{year}-{month:02d}-{last_day}"
+    return start_date, end_date
+
+def coalesce_month_ranges(months):
+    """
+    Merge selected months into contiguous date ranges.
+    
+    Duplicate months are dropped and adjacent months (including across a
+    year boundary) are combined, so twelve consecutive months become a
+    single range query.
+    
+    Args:
+        months (list): List of month/year dictionaries
+        
+    Returns:
+        list: (start_date: str, end_date: str) tuples in chronological order
+    """
+    # Represent each month as a running month index so adjacency is a +1 check
+    month_indexes = sorted({int(date['year']) * 12 + int(date['month']) - 1 for date in months})
+    
+    spans = []
+    for index in month_indexes:
+        if spans and spans[-1][1] == index - 1:
+            spans[-1][1] = index
+        else:
+            spans.append([index, index])
+    
+    ranges = []
+    for first, last in spans:
+        start_date, _ = get_month_date_range(first % 12 + 1, first // 12)
+        _, end_date = get_month_date_range(last % 12 + 1, last // 12)
+        ranges.append((start_date, end_date))
+    return ranges
+
+def iter_invoice_pages(headers, params, priority=upstream_scheduler.INTERACTIVE):
+    """
+    Yield every page of billing/invoices records for the given filters.
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        params (dict): Filter parameters (without paging)
+        priority (int): Upstream scheduling priority
+        
+    Yields:
+        list: InvoiceRecord objects for one page (next page is prefetched)
+    """
+    return nexudus_client.iter_pages('billing/invoices', headers, params, INVOICE_PAGE_SIZE,
+                                     project=InvoiceRecord.project_page, priority=priority)
+
+def invoice_range_params(team_name, start_date, end_date):
+    """
+    Build billing/invoices filters for one team and date range.
+    
+    Pages are sorted by invoice start date (as mirror reads are), so results
+    come back in chronological order and page boundaries stay put if newer
+    invoices are added while the range is being crawled.
+    
+    Args:
+        team_name (str): Name of the team/company
+        start_date (str): First day of the range (YYYY-MM-DD)
+        end_date (str): Last day of the range (YYYY-MM-DD)
+        
+    Returns:
+        dict: Filter parameters (without paging)
+    """
+    return {
+        'Invoice_BillToName': team_name,
+        'from_Invoice_InvoiceFromDate': f"{start_date}T00:00:00",
+        'to_Invoice_InvoiceToDate': f"{end_date}T23:59:59",
+        'orderBy': 'InvoiceFromDate',
+        'dir': 'Ascending'
+    }
+
+def fetch_invoices_for_range(headers, team_name, start_date, end_date, cancel_event,
+                             priority=upstream_scheduler.INTERACTIVE):
+    """
+    Fetch all invoices for a date range (worker for fetch_invoices_for_periods).
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        team_name (str): Name of the team/company
+        start_date (str): First day of the range (YYYY-MM-DD)
+        end_date (str): Last day of the range (YYYY-MM-DD)
+        cancel_event (threading.Event): Set when another range has failed
+        priority (int): Upstream scheduling priority
+        
+    Returns:
+        tuple: (success: bool, data: list or error_message: str)
+    """
+    # Skip the upstream call entirely if the report has already failed
+    if cancel_event.is_set():
+        return False, f"Cancelled fetch for {start_date} to {end_date}"
+    
+    params = invoice_range_params(team_name, start_date, end_date)
+    
+    logger.info(f"Fetching invoices for {team_name}, {start_date} to {end_date}")
+    invoices = []
+    for records in iter_invoice_pages(headers, params, priority):
+        if cancel_event.is_set():
+            return False, f"Cancelled fetch for {start_date} to {end_date}"
+        invoices.extend(records)
+    
+    logger.info(f"Found {len(invoices)} invoices for {start_date} to {end_date}")
+    return True, invoices
+
+@metrics.timed('fetch_invoices_for_periods')
+def fetch_invoices_for_periods(headers, team_name, months, max_workers=None,
+                               priority=upstream_scheduler.INTERACTIVE):
+    """
+    Fetch invoices for multiple time periods (shared between endpoints).
+    
+    Adjacent months are merged into date ranges, every page of each range is
+    retrieved, and ranges are queried concurrently on a bounded thread pool.
+    Results are returned in chronological order, and the first failing range
+    cancels every query that has not started yet.
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        team_name (str): Name of the team/company
+        months (list): List of month/year dictionaries
+        max_workers (int): Concurrency limit (defaults to INVOICE_FETCH_CONCURRENCY)
+        priority (int): Upstream scheduling priority
+        
+    Returns:
+        tuple: (success: bool, data: list or error_message: str)
+    """
+    try:
+        ranges = coalesce_month_ranges(months)
+        workers = max(1, min(max_workers or INVOICE_FETCH_CONCURRENCY, len(ranges)))
+        results = [None] * len(ranges)
+        cancel_event = threading.Event()
+        
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='invoice-fetch')
+        try:
+            futures = {
+                executor.submit(fetch_invoices_for_range, headers, team_name,
+                                start_date, end_date, cancel_event, priority): idx
+                for idx, (start_date, end_date) in enumerate(ranges)
             }
             
-            logger.info(f"Fetching invoices for {team_name}, {month}/{year}")
-            response = requests.get(url, headers=headers, params=params, timeout=10)
-            
-            if response.ok:
-                invoice_data = response.json().get('Records', [])
-                all_invoices.extend(invoice_data)
-                logger.info(f"Found {len(invoice_data)} invoices for {month}/{year}")
-            else:
-                logger.error(f"API error for {month}/{year}: {response.status_code}")
-                return False, f"Failed to fetch invoices for {month}/{year}: {response.text}"
+            for future in as_completed(futures):
+                success, data = future.result()
+                if not success:
+                    return False, data
+                results[futures[future]] = data
+        finally:
+            # Fail fast: drop queued ranges and don't wait on in-flight ones
+            cancel_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        # Flatten per-range results in deterministic (chronological) order
+        all_invoices = []
+        for invoice_data in results:
+            all_invoices.extend(invoice_data)
         
         return True, all_invoices
         
+    except nexudus_client.NexudusAPIError as e:
+        return False, str(e)
     except requests.exceptions.Timeout:
         return False, "Request timed out. Please try again."
     except requests.exceptions.ConnectionError:
@@ -422,6 +1163,746 @@ def fetch_invoices_for_periods(headers, team_name, months):
         logger.error(f"Unexpected error in fetch_invoices_for_periods: {str(e)}")
         return False, f"An unexpected error occurred: {str(e)}"
 
+def fetch_teams(headers, refresh=False):
+    """
+    Fetch the team list for a credential, serving it from teams_cache when possible.
+    
+    On a cache miss the catalogue is read from the local mirror when it is
+    enabled and fresh, else crawled from Nexudus.
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        refresh (bool): Drop any cached list and read the catalogue from Nexudus
+        
+    Returns:
+        tuple: (success: bool, entry: dict or upstream_status_code: int)
+            where entry has 'data', 'etag' and 'last_modified' keys
+    """
+    cache_key = credential_key(headers)
+    if refresh:
+        teams_cache.invalidate(cache_key)
+    else:
+        entry = teams_cache.get(cache_key)
+        if entry is not None:
+            return True, entry
+    
+    teams = None
+    try:
+        if not refresh and use_mirror(headers):
+            try:
+                teams = mirror.list_teams()
+            except Exception as e:
+                logger.error(f"Mirror team read failed, falling back to Nexudus: {str(e)}")
+        
+        if teams is None:
+            # Crawl every page of the catalogue (the next page is prefetched)
+            teams = []
+            for records in nexudus_client.iter_pages('spaces/teams', headers, {'dir': 'Ascending'},
+                                                     TEAM_PAGE_SIZE):
+                teams.extend(records)
+    except nexudus_client.NexudusAPIError as e:
+        logger.error(f"Failed to retrieve teams: {e.status_code}")
+        return False, e.status_code
+    
+    logger.info(f"Retrieved {len(teams)} teams")
+    
+    teams_data = {'Records': teams, 'TotalItems': len(teams)}
+    entry = {
+        'data': teams_data,
+        'index': TeamIndex(teams),
+        'etag': hashlib.sha1(json.dumps(teams_data, sort_keys=True).encode()).hexdigest(),
+        'last_modified': datetime.now(timezone.utc).replace(microsecond=0)
+    }
+    teams_cache.set(cache_key, entry)
+    return True, entry
+
+def use_mirror(headers, freshness='mirror'):
+    """
+    Decide whether a read may be answered from the local mirror.
+    
+    The mirror holds the sync account's data, so valid credentials alone are
+    not enough (Nexudus is multi-tenant). The caller must be on
+    MIRROR_ALLOWED_USERS when it is set, and must see the same team
+    catalogue as the mirror: one lightweight call checks that its first team
+    is mirrored and its team count matches. The outcome is cached per
+    credential; everyone else reads live.
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        freshness (str): 'mirror' allows a mirror read, 'live' forces an upstream read
+        
+    Returns:
+        bool: True if the mirror is enabled, fresh and allowed
+        
+    Raises:
+        nexudus_client.NexudusAPIError: If Nexudus rejects the caller's credentials
+    """
+    if mirror is None or freshness == 'live':
+        return False
+    
+    fresh = mirror.is_fresh()
+    metrics.record_cache('invoice_mirror', fresh)
+    if not fresh:
+        return False
+    
+    cache_key = credential_key(headers)
+    allowed = mirror_access_cache.get(cache_key)
+    if allowed is None:
+        allowed = caller_shares_mirror(headers)
+        mirror_access_cache.set(cache_key, allowed)
+    return allowed
+
+def credential_email(headers):
+    """
+    Read the account email out of a Basic Authorization header.
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        
+    Returns:
+        str or None: Case-folded email, or None if the header is not Basic auth
+    """
+    scheme, _, encoded = headers['Authorization'].partition(' ')
+    if scheme != 'Basic':
+        return None
+    try:
+        return base64.b64decode(encoded).decode().partition(':')[0].casefold()
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def caller_shares_mirror(headers):
+    """
+    Check whether a caller belongs to the business the mirror was synced from.
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        
+    Returns:
+        bool: True if the caller may read mirrored invoices and teams
+        
+    Raises:
+        nexudus_client.NexudusAPIError: If Nexudus rejects the caller's credentials
+    """
+    if MIRROR_ALLOWED_USERS and credential_email(headers) not in MIRROR_ALLOWED_USERS:
+        return False
+    
+    response = nexudus_client.get('spaces/teams', headers=headers,
+                                  params={'page': 1, 'size': 1, 'dir': 'Ascending'})
+    if not response.ok:
+        raise nexudus_client.NexudusAPIError("Invalid credentials",
+                                             status_code=response.status_code)
+    
+    payload = nexudus_client.decode_json(response)
+    team_ids = [team.get('RecordID') or team.get('Id') for team in payload.get('Records', [])]
+    if not mirror.matches_team_catalogue(team_ids, payload.get('TotalItems')):
+        logger.warning("Caller does not see the mirrored team catalogue; serving live reads")
+        return False
+    return True
+
+def load_invoices(headers, team_name, months, freshness='mirror',
+                  priority=upstream_scheduler.INTERACTIVE):
+    """
+    Load invoices from the local mirror when allowed and fresh, else from Nexudus.
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        team_name (str): Name of the team/company
+        months (list): List of month/year dictionaries
+        freshness (str): 'mirror' allows a mirror read, 'live' forces an upstream read
+        priority (int): Upstream scheduling priority
+        
+    Returns:
+        tuple: (success: bool, data: list or error_message: str)
+    """
+    success, data, _ = load_invoices_with_source(headers, team_name, months, freshness, priority)
+    return success, data
+
+def load_invoices_with_source(headers, team_name, months, freshness='mirror',
+                              priority=upstream_scheduler.INTERACTIVE):
+    """
+    Same as load_invoices, also reporting where the invoices came from.
+    
+    Returns:
+        tuple: (success: bool, data: list or error_message: str,
+            source: 'mirror' or 'live')
+    """
+    try:
+        if use_mirror(headers, freshness):
+            invoices = mirror.query_invoices(team_name, coalesce_month_ranges(months))
+            logger.info(f"Served {len(invoices)} invoices for {team_name} from the local mirror")
+            return True, invoices, 'mirror'
+        
+    except nexudus_client.NexudusAPIError as e:
+        return False, str(e), 'live'
+    except requests.exceptions.Timeout:
+        return False, "Request timed out. Please try again.", 'live'
+    except requests.exceptions.ConnectionError:
+        return False, "Unable to connect to the API. Please check your internet connection.", 'live'
+    except Exception as e:
+        logger.error(f"Mirror read failed, falling back to Nexudus: {str(e)}")
+    
+    success, data = fetch_invoices_for_periods(headers, team_name, months, priority=priority)
+    return success, data, 'live'
+
+def stream_range_pages(headers, params, pages, cancel_event,
+                       priority=upstream_scheduler.INTERACTIVE):
+    """
+    Read one date range's pages into a bounded queue (worker for iter_invoices_for_periods).
+    
+    The queue receives each page, then RANGE_DONE, or the exception that
+    stopped the crawl. Blocks while the queue is full so only a few pages
+    per range are held; gives up once cancel_event is set.
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        params (dict): Filter parameters (without paging)
+        pages (queue.Queue): Queue handed to the consumer
+        cancel_event (threading.Event): Set when the consumer has stopped
+        priority (int): Upstream scheduling priority
+    """
+    def put(item):
+        while not cancel_event.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    if cancel_event.is_set():
+        return
+    
+    crawl = iter_invoice_pages(headers, params, priority)
+    try:
+        for records in crawl:
+            if not put(records):
+                return
+        put(RANGE_DONE)
+    except Exception as e:
+        put(e)
+    finally:
+        crawl.close()
+
+def iter_invoices_for_periods(headers, team_name, months, freshness='mirror',
+                              priority=upstream_scheduler.INTERACTIVE):
+    """
+    Yield a team's invoices for the selected periods as pages arrive.
+    
+    Unlike fetch_invoices_for_periods this never holds more than a page or
+    two per range in flight, so callers can stream rows out while the crawl
+    is still running. Ranges are crawled concurrently (bounded by
+    INVOICE_FETCH_CONCURRENCY) and their pages are yielded in chronological
+    order. If the mirror read fails, Nexudus is streamed instead (as in
+    load_invoices).
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        team_name (str): Name of the team/company
+        months (list): List of month/year dictionaries
+        freshness (str): 'mirror' allows a mirror read, 'live' forces an upstream read
+        priority (int): Upstream scheduling priority
+        
+    Yields:
+        list: InvoiceRecord objects for one page
+        
+    Raises:
+        nexudus_client.NexudusAPIError: If Nexudus rejects a request
+        requests.exceptions.RequestException: On timeouts or connection failures
+    """
+    ranges = coalesce_month_ranges(months)
+    
+    invoices = None
+    try:
+        if use_mirror(headers, freshness):
+            invoices = mirror.query_invoices(team_name, ranges)
+    except (nexudus_client.NexudusAPIError, requests.exceptions.RequestException):
+        raise
+    except Exception as e:
+        logger.error(f"Mirror read failed, falling back to Nexudus: {str(e)}")
+    
+    if invoices is not None:
+        logger.info(f"Served {len(invoices)} invoices for {team_name} from the local mirror")
+        yield invoices
+        return
+    
+    if not ranges:
+        return
+    
+    workers = max(1, min(INVOICE_FETCH_CONCURRENCY, len(ranges)))
+    range_pages = [queue.Queue(maxsize=INVOICE_STREAM_BUFFER_PAGES) for _ in ranges]
+    cancel_event = threading.Event()
+    
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='invoice-stream')
+    try:
+        for (start_date, end_date), pages in zip(ranges, range_pages):
+            executor.submit(stream_range_pages, headers,
+                            invoice_range_params(team_name, start_date, end_date),
+                            pages, cancel_event, priority)
+        
+        for (start_date, end_date), pages in zip(ranges, range_pages):
+            logger.info(f"Streaming invoices for {team_name}, {start_date} to {end_date}")
+            while True:
+                records = pages.get()
+                if records is RANGE_DONE:
+                    break
+                if isinstance(records, Exception):
+                    raise records
+                yield records
+    finally:
+        # Stop workers of a failed or abandoned stream and drop ranges not started yet
+        cancel_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def new_workbook(output):
+    """
+    Open a constant_memory XlsxWriter workbook.
+    
+    XlsxWriter is imported on first use so workers that never build a
+    report start faster.
+    
+    Args:
+        output (file): Binary file object the XLSX is written to
+        
+    Returns:
+        xlsxwriter.Workbook: Workbook that flushes each finished row to disk
+    """
+    import xlsxwriter
+    
+    return xlsxwriter.Workbook(output, {'constant_memory': True, 'tmpdir': EXCEL_TMPDIR})
+
+def add_header_format(workbook):
+    """
+    Create the header cell format shared by every report sheet.
+    
+    Args:
+        workbook (xlsxwriter.Workbook): Workbook the format belongs to
+        
+    Returns:
+        xlsxwriter.format.Format: Header format
+    """
+    return workbook.add_format({
+        'bold': True,
+        'text_wrap': True,
+        'valign': 'top',
+        'fg_color': '#D7E4BC',
+        'border': 1
+    })
+
+def add_invoice_sheet(workbook, pages, sheet_name='Invoice Report'):
+    """
+    Write invoice pages to a new worksheet, one row per invoice.
+    
+    Rows are written strictly in order so the sheet works with XlsxWriter's
+    constant_memory mode, which flushes each finished row to disk.
+    
+    Args:
+        workbook (xlsxwriter.Workbook): Workbook to add the sheet to
+        pages (iterable): Lists of InvoiceRecord objects
+        sheet_name (str): Worksheet name
+        
+    Returns:
+        int: Number of invoice rows written
+    """
+    worksheet = workbook.add_worksheet(sheet_name)
+    header_format = add_header_format(workbook)
+    
+    # Apply header formatting
+    for col_num, value in enumerate(INVOICE_COLUMN_MAPPING.values()):
+        worksheet.set_column(col_num, col_num, 15)  # Set column width
+        worksheet.write(0, col_num, value, header_format)
+    
+    row = 0
+    for records in pages:
+        for invoice in records:
+            row += 1
+            worksheet.write_row(row, 0, invoice.values())
+    
+    return row
+
+def add_summary_sheet(workbook, rollup, sheet_name='Summary'):
+    """
+    Write a per-team, per-month gross amount rollup to a new worksheet.
+    
+    Args:
+        workbook (xlsxwriter.Workbook): Workbook to add the sheet to
+        rollup (pandas.DataFrame): Rollup with month-over-month columns
+        sheet_name (str): Worksheet name
+    """
+    worksheet = workbook.add_worksheet(sheet_name)
+    header_format = add_header_format(workbook)
+    percent_format = workbook.add_format({'num_format': '0.0%'})
+    
+    for col_num, value in enumerate(['Company Name', 'Month', 'Gross Amount', 'Invoices',
+                                     'Change vs Previous Month', 'Change %']):
+        worksheet.set_column(col_num, col_num, 15)
+        worksheet.write(0, col_num, value, header_format)
+    
+    for row, entry in enumerate(rollup_to_records(rollup), start=1):
+        worksheet.write_row(row, 0, [entry['team_name'], entry['month'], entry['total_gross'],
+                                     entry['invoice_count'], entry['mom_delta']])
+        worksheet.write(row, 5, entry['mom_pct'], percent_format)
+
+def track_rollups(pages, partials):
+    """
+    Pass invoice pages through while collecting a rollup of each page.
+    
+    Args:
+        pages (iterable): Lists of InvoiceRecord objects
+        partials (list): Receives one rollup DataFrame per page
+        
+    Yields:
+        list: The unchanged pages
+    """
+    for records in pages:
+        partials.append(rollup_invoices(records))
+        yield records
+
+def write_invoice_workbook(output, pages, include_summary=False):
+    """
+    Write an invoice report workbook in constant memory.
+    
+    Args:
+        output (file): Binary file object the XLSX is written to
+        pages (iterable): Lists of InvoiceRecord objects
+        include_summary (bool): Add a per-team, per-month "Summary" sheet
+        
+    Returns:
+        int: Number of invoice rows written
+    """
+    workbook = new_workbook(output)
+    try:
+        partials = []
+        if include_summary:
+            pages = track_rollups(pages, partials)
+        
+        row_count = add_invoice_sheet(workbook, pages)
+        
+        if include_summary:
+            with metrics.time_stage('excel_summary_dataframe'):
+                add_summary_sheet(workbook, add_month_over_month(combine_rollups(partials)))
+        return row_count
+    finally:
+        workbook.close()
+
+def rollup_team_months(team_name, headers, months, freshness,
+                       priority=upstream_scheduler.INTERACTIVE):
+    """
+    Build one team's per-month rollup, reusing cached closed months (summary worker).
+    
+    Every requested month appears in the result, with zero totals when the
+    team has no invoices for it. Only closed months computed from live
+    Nexudus data are cached (the mirror may lag behind), and 'live' requests
+    skip the cache so they always see current data.
+    
+    Args:
+        team_name (str): Name of the team/company
+        headers (dict): Authorization headers for API requests
+        months (list): List of month/year dictionaries
+        freshness (str): 'mirror' allows a mirror read, 'live' forces an upstream read
+        priority (int): Upstream scheduling priority
+        
+    Returns:
+        tuple: (success: bool, data: pandas.DataFrame or error_message: str)
+    """
+    owner = credential_key(headers)
+    periods = sorted({(int(date['year']), int(date['month'])) for date in months})
+    
+    totals = {}
+    missing = []
+    for year, month in periods:
+        cached = None
+        if freshness != 'live' and is_closed_month(year, month):
+            cached = rollup_cache.get((owner, team_name, year, month))
+        if cached is None:
+            missing.append({'month': month, 'year': year})
+        else:
+            totals[(year, month)] = cached
+    
+    if missing:
+        success, result, source = load_invoices_with_source(headers, team_name, missing, freshness,
+                                                             priority)
+        if not success:
+            return False, result
+        
+        # Collapse to one entry per month (bill-to names may vary slightly).
+        # Adjacent months are fetched as one range, which also returns invoices
+        # spanning two of them; drop those so each month's entry matches a
+        # single-month query and can be cached regardless of the selection.
+        fetched = month_totals(within_one_month(result))
+        for date in missing:
+            year, month = date['year'], date['month']
+            entry = fetched.get((year, month), (0.0, 0))
+            totals[(year, month)] = entry
+            if source == 'live' and is_closed_month(year, month):
+                rollup_cache.set((owner, team_name, year, month), entry)
+    
+    return True, rollup_from_month_totals(team_name, totals)
+
+def send_report_file(output, filename, mimetype):
+    """
+    Send a finished report file as a chunked download.
+    
+    Args:
+        output (file): Binary file object positioned anywhere; closed after sending
+        filename (str): Download filename
+        mimetype (str): Content type of the file
+        
+    Returns:
+        flask.Response: Attachment response with Content-Length set
+    """
+    output.seek(0)  # Reset file position to beginning
+    response = send_file(
+        output,
+        as_attachment=True,
+        download_name=filename,
+        mimetype=mimetype
+    )
+    response.content_length = os.fstat(output.fileno()).st_size
+    metrics.EXCEL_BYTES.labels(kind=os.path.splitext(filename)[1].lstrip('.')).observe(
+        response.content_length)
+    return response
+
+def safe_sheet_name(team_name, used_names):
+    """
+    Turn a team name into a unique, valid Excel worksheet name.
+    
+    Args:
+        team_name (str): Name of the team/company
+        used_names (set): Lower-cased names already used in the workbook (updated)
+        
+    Returns:
+        str: Worksheet name of at most 31 characters
+    """
+    base = re.sub(r'[\[\]:*?/\\]', '_', team_name).strip("' ")[:31] or 'Team'
+    name, suffix = base, 2
+    while name.lower() in used_names:
+        tag = f" ({suffix})"
+        name = base[:31 - len(tag)] + tag
+        suffix += 1
+    used_names.add(name.lower())
+    return name
+
+def render_team_workbook(headers, team_name, months, freshness):
+    """
+    Fetch one team's invoices and render its workbook (batch worker).
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        team_name (str): Name of the team/company
+        months (list): List of month/year dictionaries
+        freshness (str): 'mirror' allows a mirror read, 'live' forces an upstream read
+        
+    Returns:
+        tuple: (summary_entry: dict, output: file or None)
+    """
+    output = tempfile.TemporaryFile(dir=EXCEL_TMPDIR)
+    try:
+        row_count = write_invoice_workbook(
+            output, iter_invoices_for_periods(headers, team_name, months, freshness,
+                                              upstream_scheduler.BATCH))
+    except Exception as e:
+        output.close()
+        logger.error(f"Batch report failed for {team_name}: {str(e)}")
+        return {'team_name': team_name, 'status': 'error', 'invoices': 0, 'error': str(e)}, None
+    
+    if row_count == 0:
+        output.close()
+        return {'team_name': team_name, 'status': 'empty', 'invoices': 0, 'error': None}, None
+    
+    return {'team_name': team_name, 'status': 'ok', 'invoices': row_count, 'error': None}, output
+
+def run_batch(worker, team_names, *args):
+    """
+    Run a per-team worker on the batch pool, logging progress as teams finish.
+    
+    Args:
+        worker (callable): Called as worker(team_name, *args)
+        team_names (list): Team/company names
+        *args: Extra worker arguments
+        
+    Yields:
+        tuple: (index: int, result) in completion order
+    """
+    workers = max(1, min(BATCH_REPORT_WORKERS, len(team_names)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch-report') as executor:
+        futures = {executor.submit(worker, team_name, *args): idx
+                   for idx, team_name in enumerate(team_names)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            logger.info(f"Batch progress: {done}/{len(team_names)} teams "
+                        f"(finished {team_names[futures[future]]})")
+            yield futures[future], future.result()
+
+def build_batch_zip(headers, team_names, months, freshness):
+    """
+    Build a ZIP with one workbook per team plus batch_summary.json.
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        team_names (list): Team/company names
+        months (list): List of month/year dictionaries
+        freshness (str): 'mirror' allows a mirror read, 'live' forces an upstream read
+        
+    Returns:
+        tuple: (output: file, summary: list of per-team dicts in request order)
+    """
+    summary = [None] * len(team_names)
+    used_names = set()
+    output = tempfile.TemporaryFile(dir=EXCEL_TMPDIR)
+    
+    # Workbooks are already deflated, so store them as-is
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for idx, (entry, workbook_file) in run_batch(
+                lambda team_name: render_team_workbook(headers, team_name, months, freshness),
+                team_names):
+            summary[idx] = entry
+            if workbook_file is None:
+                continue
+            with workbook_file:
+                workbook_file.seek(0)
+                member = f"{safe_sheet_name(team_names[idx], used_names)}.xlsx"
+                with archive.open(member, 'w') as target:
+                    shutil.copyfileobj(workbook_file, target)
+        
+        archive.writestr('batch_summary.json', json.dumps(summary, indent=2))
+    
+    return output, summary
+
+def build_batch_workbook(headers, team_names, months, freshness):
+    """
+    Build one workbook with a summary sheet and one sheet per team.
+    
+    Teams are fetched on the batch pool; sheets are written in request order
+    as soon as each team's data (and every team before it) is available.
+    
+    Args:
+        headers (dict): Authorization headers for API requests
+        team_names (list): Team/company names
+        months (list): List of month/year dictionaries
+        freshness (str): 'mirror' allows a mirror read, 'live' forces an upstream read
+        
+    Returns:
+        tuple: (output: file, summary: list of per-team dicts in request order)
+    """
+    summary = [None] * len(team_names)
+    pending = {}
+    next_idx = 0
+    used_names = {'batch summary'}
+    output = tempfile.TemporaryFile(dir=EXCEL_TMPDIR)
+    workbook = new_workbook(output)
+    try:
+        summary_sheet = workbook.add_worksheet('Batch Summary')
+        
+        for idx, (success, result) in run_batch(
+                lambda team_name: load_invoices(headers, team_name, months, freshness,
+                                                upstream_scheduler.BATCH),
+                team_names):
+            pending[idx] = (success, result)
+            
+            # Flush every team whose predecessors are done, releasing its records
+            while next_idx in pending:
+                success, result = pending.pop(next_idx)
+                team_name = team_names[next_idx]
+                if not success:
+                    summary[next_idx] = {'team_name': team_name, 'status': 'error',
+                                         'invoices': 0, 'error': result}
+                elif not result:
+                    summary[next_idx] = {'team_name': team_name, 'status': 'empty',
+                                         'invoices': 0, 'error': None}
+                else:
+                    add_invoice_sheet(workbook, [result], safe_sheet_name(team_name, used_names))
+                    summary[next_idx] = {'team_name': team_name, 'status': 'ok',
+                                         'invoices': len(result), 'error': None}
+                next_idx += 1
+        
+        header_format = add_header_format(workbook)
+        for col_num, value in enumerate(['Team', 'Status', 'Invoices', 'Error']):
+            summary_sheet.set_column(col_num, col_num, 15)
+            summary_sheet.write(0, col_num, value, header_format)
+        for row, entry in enumerate(summary, start=1):
+            summary_sheet.write_row(row, 0, [entry['team_name'], entry['status'],
+                                             entry['invoices'], entry['error'] or ''])
+    finally:
+        workbook.close()
+    
+    return output, summary
+
+def lookup_report_job(job_id):
+    """
+    Find a report job owned by the caller's session or credentials.
+    
+    Args:
+        job_id (str): Public job identifier
+        
+    Returns:
+        tuple: (job: ReportJob or None, error_response: tuple or None)
+    """
+    headers, error_response = resolve_auth_headers()
+    if headers is None:
+        return None, error_response
+    
+    job = report_jobs.get(job_id, credential_key(headers))
+    if job is None:
+        return None, (jsonify({'error': 'Report job not found or expired'}), 404)
+    
+    return job, None
+
+def run_report_job(job, headers, team_name, months, freshness):
+    """
+    Build one invoice report workbook for a background job.
+    
+    Args:
+        job (ReportJob): Job being run (receives progress updates)
+        headers (dict): Authorization headers for API requests
+        team_name (str): Name of the team/company
+        months (list): List of month/year dictionaries
+        freshness (str): 'mirror' allows a mirror read, 'live' forces an upstream read
+        
+    Raises:
+        ReportJobError: If the invoices cannot be fetched or none exist
+    """
+    job.update_progress(stage='fetching', team_name=team_name)
+    success, result = load_invoices(headers, team_name, months, freshness, upstream_scheduler.BATCH)
+    if not success:
+        raise ReportJobError(result)
+    if not result:
+        raise ReportJobError('No invoices found for the selected periods')
+    
+    job.update_progress(stage='writing', invoices=len(result))
+    with open(job.result_path, 'wb') as output:
+        write_invoice_workbook(output, [result])
+    
+    logger.info(f"Report job {job.job_id}: generated Excel file for {team_name} "
+                f"with {len(result)} invoices")
+
+def mirror_sync_headers():
+    """
+    Build authorization headers for the mirror sync account.
+    
+    Returns:
+        dict or None: Headers, or None when NEXUDUS_SYNC_EMAIL/PASSWORD are unset
+    """
+    username = os.environ.get('NEXUDUS_SYNC_EMAIL')
+    password = os.environ.get('NEXUDUS_SYNC_PASSWORD')
+    if not username or not password:
+        return None
+    return {'Authorization': encode_auth(username, password)}
+
+@app.cli.command('sync-mirror')
+def sync_mirror_command():
+    """Run one incremental sync of the local invoice mirror (for cron use)."""
+    headers = mirror_sync_headers()
+    if mirror is None or headers is None:
+        logger.error("Set INVOICE_MIRROR_DB, NEXUDUS_SYNC_EMAIL and NEXUDUS_SYNC_PASSWORD to sync the mirror")
+        return
+    mirror.sync(headers)
+
+# Keep the mirror current from inside the web process unless syncing via cron
+if mirror is not None and os.environ.get('MIRROR_BACKGROUND_SYNC', 'true').lower() == 'true':
+    if mirror_sync_headers() is not None:
+        mirror.start_background_sync(mirror_sync_headers())
+    else:
+        logger.warning("Invoice mirror enabled without sync credentials; serving live reads only")
+
 if __name__ == '__main__':
     # Run Flask development server with debug mode enabled
     # In production, this should be run through a WSGI server like Gunicorn
@@ -0,0 +1,147 @@
+"""
+CoMotion Financial Reports Automation - Cold Start Measurement
+
+Measures what a fresh worker process pays before it can answer requests:
+the time to import the backend and the resident memory afterwards, then the
+extra time and memory when the first Excel report (XlsxWriter) and the
+first rollup (pandas) are built. Every run uses a new interpreter; medians
+are printed and saved under bench/results/ so runs on different revisions
+can be compared.
+
+Usage:
+    python bench/cold_start.py --runs 7
+    python bench/cold_start.py --compare bench/results/cold-start-<earlier>.json
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+# Runs inside a fresh interpreter and prints one JSON line of measurements
+PROBE = r'''
+import io, json, sys, time
+
+def rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+def loaded():
+    return [name for name in ('pandas', 'numpy', 'xlsxwriter') if name in sys.modules]
+
+result = {}
+started = time.perf_counter()
+import app
+result['import_s'] = time.perf_counter() - started
+result['import_rss_mb'] = rss_mb()
+result['import_loaded'] = loaded()
+
+started = time.perf_counter()
+app.write_invoice_workbook(io.BytesIO(), [])
+result['first_excel_s'] = time.perf_counter() - started
+result['excel_rss_mb'] = rss_mb()
+
+started = time.perf_counter()
+app.rollup_invoices([])
+result['first_rollup_s'] = time.perf_counter() - started
+result['rollup_rss_mb'] = rss_mb()
+result['rollup_loaded'] = loaded()
+print(json.dumps(result))
+'''
+
+# Measurements summarised across runs (seconds are reported in ms)
+MEASUREMENTS = ('import_s', 'import_rss_mb', 'first_excel_s', 'excel_rss_mb',
+                'first_rollup_s', 'rollup_rss_mb')
+
+def probe_once():
+    """
+    Start a fresh interpreter, import the backend and take measurements.
+
+    Returns:
+        dict: Measurements of one cold start
+    """
+    env = dict(os.environ, SECRET_KEY='cold-start', MIRROR_BACKGROUND_SYNC='false')
+    env.pop('INVOICE_MIRROR_DB', None)
+    output = subprocess.check_output([sys.executable, '-c', PROBE], cwd=APP_DIR, env=env,
+                                     stderr=subprocess.DEVNULL, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+def summarise(runs):
+    """
+    Median of every measurement across runs.
+
+    Args:
+        runs (list): Results of probe_once()
+
+    Returns:
+        dict: Median per measurement, plus the modules loaded at each stage
+    """
+    summary = {}
+    for name in MEASUREMENTS:
+        values = [run[name] for run in runs if run.get(name) is not None]
+        if values:
+            median = statistics.median(values)
+            summary[name] = round(median * 1000, 1) if name.endswith('_s') else round(median, 1)
+    summary['import_loaded'] = runs[0]['import_loaded']
+    summary['rollup_loaded'] = runs[0]['rollup_loaded']
+    return summary
+
+def print_summary(summary, baseline=None):
+    """Print medians, with the baseline value alongside when comparing."""
+    for name in MEASUREMENTS:
+        if name not in summary:
+            continue
+        unit = 'ms' if name.endswith('_s') else 'MB'
+        line = f"{name[:-2] if unit == 'ms' else name:<20}{summary[name]:>10.1f} {unit}"
+        if baseline and baseline.get(name):
+            change = (summary[name] - baseline[name]) / baseline[name]
+            line += f"   (was {baseline[name]:.1f}, {change:+.0%})"
+        print(line)
+    print(f"{'modules after import':<20} {', '.join(summary['import_loaded']) or 'none of pandas/numpy/xlsxwriter'}")
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Measure backend cold start time and memory')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to measure')
+    parser.add_argument('--output', help='Results file (default: bench/results/cold-start-<timestamp>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    runs = [probe_once() for _ in range(args.runs)]
+    summary = summarise(runs)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['summary']
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"cold-start-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as output_file:
+        json.dump({'created': datetime.now().isoformat(timespec='seconds'),
+                   'python': sys.version.split()[0],
+                   'summary': summary,
+                   'runs': runs}, output_file, indent=2)
+
+    print_summary(summary, baseline)
+    print(f"\nResults saved to {output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
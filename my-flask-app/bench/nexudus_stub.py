@@ -0,0 +1,250 @@
+"""
+CoMotion Financial Reports Automation - Offline Nexudus Stub
+
+A local stand-in for the parts of the Nexudus API the backend uses
+(spaces/teams and billing/invoices), serving a synthetic, deterministic
+dataset of N teams with M invoices per team per month. Pagination and the
+date/team/updated-on filters behave like the real API, and latency, server
+errors and throttling (429 with Retry-After) can be injected.
+
+Point the backend at it with:
+    NEXUDUS_API_BASE_URL=http://127.0.0.1:5055/api/ python app.py
+
+Usage:
+    python bench/nexudus_stub.py --teams 200 --invoices-per-month 40 --latency-ms 80
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+import argparse
+import random
+import time
+from datetime import date, datetime
+
+from flask import Flask, jsonify, request
+
+class SyntheticDataset:
+    """
+    Deterministic invoice data computed on demand (nothing is materialised).
+
+    Args:
+        teams (int): Number of teams
+        invoices_per_month (int): Invoices per team per month
+        months (int): Number of months of history ending with the current month
+        extra_fields (int): Unused padding fields per invoice, mimicking the
+            size of real Nexudus payloads
+    """
+
+    def __init__(self, teams=50, invoices_per_month=20, months=36, extra_fields=40):
+        self.team_names = [f"Startup {index:04d}" for index in range(teams)]
+        self.team_index = {name: index for index, name in enumerate(self.team_names)}
+        self.invoices_per_month = invoices_per_month
+        self.extra_fields = extra_fields
+
+        today = date.today()
+        last = today.year * 12 + today.month - 1
+        self.first_month = last - months + 1
+        self.month_count = months
+
+    def month_bounds(self, month_index):
+        """Return (first_day, last_day) ISO strings of an absolute month index."""
+        year, month = divmod(month_index, 12)
+        month += 1
+        next_year, next_month = divmod(month_index + 1, 12)
+        last_day = (date(next_year, next_month + 1, 1) - date(year, month, 1)).days
+        return f"{year}-{month:02d}-01", f"{year}-{month:02d}-{last_day:02d}"
+
+    def team(self, index):
+        """Build the team record at a position in the catalogue."""
+        return {
+            'RecordID': index + 1,
+            'TeamName': self.team_names[index],
+            'UpdatedOn': '2020-01-01T00:00:00Z'
+        }
+
+    def invoice(self, team_idx, month_idx, position):
+        """
+        Build one invoice record.
+
+        Args:
+            team_idx (int): Team position
+            month_idx (int): Offset from the first month of history
+            position (int): Invoice number within the team's month
+        """
+        absolute_month = self.first_month + month_idx
+        first_day, last_day = self.month_bounds(absolute_month)
+        record_id = ((team_idx * self.month_count + month_idx) * self.invoices_per_month
+                     + position + 1)
+        rng = random.Random(record_id)
+        invoice = {
+            'RecordID': record_id,
+            'Invoice_BillToName': self.team_names[team_idx],
+            'Invoice_InvoiceFromDate': f"{first_day}T00:00:00Z",
+            'Invoice_InvoiceToDate': f"{last_day}T00:00:00Z",
+            'Invoice_TotalGrossAmount': round(rng.uniform(50, 5000), 2),
+            'Invoice_Reference': f"INV-{record_id:08d}",
+            'UpdatedOn': f"{first_day}T12:00:00Z"
+        }
+        for field in range(self.extra_fields):
+            invoice[f"Invoice_Extra{field:02d}"] = f"value-{record_id}-{field}"
+        return invoice
+
+    def month_range(self, from_date, to_date):
+        """
+        Return month offsets whose invoices fall inside a date filter.
+
+        Args:
+            from_date (str or None): ISO lower bound on InvoiceFromDate
+            to_date (str or None): ISO upper bound on InvoiceToDate
+
+        Returns:
+            range: Matching month offsets
+        """
+        start, stop = 0, self.month_count
+        for offset in range(self.month_count):
+            first_day, last_day = self.month_bounds(self.first_month + offset)
+            if from_date and f"{first_day}T00:00:00" < from_date[:19]:
+                start = offset + 1
+            if to_date and f"{last_day}T00:00:00" > to_date[:19]:
+                stop = min(stop, offset)
+        return range(start, max(start, stop))
+
+def paged(total, build, page, size):
+    """
+    Build a Nexudus-style paged payload from an indexed collection.
+
+    Args:
+        total (int): Number of matching records
+        build (callable): Returns the record at an index
+        page (int): 1-based page number
+        size (int): Records per page
+
+    Returns:
+        dict: Records plus Nexudus paging fields
+    """
+    start = (page - 1) * size
+    records = [build(index) for index in range(start, min(start + size, total))]
+    total_pages = (total + size - 1) // size if size else 0
+    return {
+        'Records': records,
+        'CurrentPage': page,
+        'CurrentPageSize': len(records),
+        'PageSize': size,
+        'TotalItems': total,
+        'TotalPages': total_pages,
+        'HasNextPage': page < total_pages,
+        'HasPreviousPage': page > 1
+    }
+
+def create_app(dataset, latency_ms=0, latency_jitter_ms=0, error_rate=0.0, throttle_rate=0.0):
+    """
+    Create the stub Flask app.
+
+    Args:
+        dataset (SyntheticDataset): Data to serve
+        latency_ms (float): Fixed delay added to every response
+        latency_jitter_ms (float): Extra uniformly random delay
+        error_rate (float): Fraction of requests answered with 503
+        throttle_rate (float): Fraction of requests answered with 429
+
+    Returns:
+        flask.Flask: Stub application
+    """
+    app = Flask(__name__)
+    stats = {'requests': 0, 'errors': 0, 'throttled': 0}
+
+    @app.before_request
+    def inject_faults():
+        stats['requests'] += 1
+        delay = latency_ms + random.uniform(0, latency_jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+
+        if request.path.startswith('/api/'):
+            if not request.headers.get('Authorization', '').startswith('Basic '):
+                return jsonify({'Message': 'Authorization has been denied'}), 401
+            roll = random.random()
+            if roll < throttle_rate:
+                stats['throttled'] += 1
+                return jsonify({'Message': 'Too many requests'}), 429, {'Retry-After': '1'}
+            if roll < throttle_rate + error_rate:
+                stats['errors'] += 1
+                return jsonify({'Message': 'Service unavailable'}), 503
+        return None
+
+    def paging_args(default_size):
+        page = max(1, request.args.get('page', 1, type=int))
+        size = max(1, request.args.get('size', default_size, type=int))
+        return page, size
+
+    @app.route('/api/spaces/teams')
+    def teams():
+        page, size = paging_args(25)
+        total = len(dataset.team_names)
+        return jsonify(paged(total, dataset.team, page, size))
+
+    @app.route('/api/billing/invoices')
+    def invoices():
+        page, size = paging_args(25)
+        months = dataset.month_range(request.args.get('from_Invoice_InvoiceFromDate'),
+                                     request.args.get('to_Invoice_InvoiceToDate'))
+
+        updated_since = request.args.get('from_Invoice_UpdatedOn')
+        if updated_since:
+            months = [offset for offset in months
+                      if f"{dataset.month_bounds(dataset.first_month + offset)[0]}T12:00:00Z"
+                      >= updated_since]
+
+        team_name = request.args.get('Invoice_BillToName')
+        if team_name is None:
+            team_indexes = range(len(dataset.team_names))
+        elif team_name in dataset.team_index:
+            team_indexes = [dataset.team_index[team_name]]
+        else:
+            team_indexes = []
+
+        months = list(months)
+        per_team = len(months) * dataset.invoices_per_month
+
+        def build(index):
+            team_position, remainder = divmod(index, per_team)
+            month_position, position = divmod(remainder, dataset.invoices_per_month)
+            return dataset.invoice(team_indexes[team_position], months[month_position], position)
+
+        return jsonify(paged(len(team_indexes) * per_team, build, page, size))
+
+    @app.route('/_stub/stats')
+    def stub_stats():
+        return jsonify(dict(stats, started=app.config['STARTED_AT']))
+
+    app.config['STARTED_AT'] = datetime.now().isoformat()
+    return app
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Offline Nexudus API stub')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--teams', type=int, default=50)
+    parser.add_argument('--invoices-per-month', type=int, default=20)
+    parser.add_argument('--months', type=int, default=36, help='Months of history to serve')
+    parser.add_argument('--extra-fields', type=int, default=40)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--latency-jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction answered with 503')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction answered with 429')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for injected faults and jitter')
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    random.seed(args.seed)
+    stub = create_app(
+        SyntheticDataset(args.teams, args.invoices_per_month, args.months, args.extra_fields),
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate
+    )
+    stub.run(host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,415 @@
+"""
+CoMotion Financial Reports Automation - Benchmark Suite
+
+Starts the offline Nexudus stub and the backend (pointed at the stub), then
+drives /get_invoices and /generate_excel across report sizes and concurrency
+levels. For every scenario it reports throughput, p50/p99 latency, errors
+and the backend's peak RSS while the scenario ran. Results are saved as JSON
+under bench/results/ and can be compared with an earlier run to catch
+regressions.
+
+Usage:
+    python bench/run_benchmark.py
+    python bench/run_benchmark.py --months 1 12 --concurrency 1 8 --latency-ms 50
+    python bench/run_benchmark.py --compare bench/results/baseline.json
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+ENDPOINTS = ('get_invoices', 'generate_excel')
+
+def bench_team(index, teams):
+    """
+    Name of the synthetic team the index-th request of a scenario reports on.
+
+    Requests rotate through the stub's teams so concurrent requests are not
+    identical (identical upstream calls would be coalesced into one).
+    """
+    return f"Startup {index % teams:04d}"
+
+def free_port():
+    """Return a TCP port that is currently free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_until_up(url, process, timeout=30):
+    """
+    Poll a URL until it answers, failing early if the process has exited.
+
+    Args:
+        url (str): URL to poll
+        process (subprocess.Popen): Server process
+        timeout (float): Seconds to wait
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}: {url}")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+def process_tree_rss(pid):
+    """
+    Resident set size of a process and its children, in bytes (Linux /proc).
+
+    Args:
+        pid (int): Root process id
+
+    Returns:
+        int: Total RSS, or 0 when /proc is unavailable
+    """
+    pids, total = [pid], 0
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+            with open(f"/proc/{current}/task/{current}/children") as children:
+                pids.extend(int(child) for child in children.read().split())
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue
+    return total
+
+class RSSSampler:
+    """
+    Samples the backend's RSS in a background thread and keeps the peak.
+
+    Args:
+        pid (int): Backend process id
+        interval (float): Seconds between samples
+    """
+
+    def __init__(self, pid, interval=0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process_tree_rss(self.pid))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = process_tree_rss(self.pid)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a list of numbers.
+
+    Args:
+        values (list): Samples
+        fraction (float): Percentile as a fraction (0.99 for p99)
+
+    Returns:
+        float or None: Percentile value, or None for no samples
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+def recent_months(count):
+    """
+    Build the months payload for the last `count` months, ending last month.
+
+    Args:
+        count (int): Number of months
+
+    Returns:
+        list: [{"month": m, "year": y}, ...]
+    """
+    today = date.today()
+    last = today.year * 12 + today.month - 2
+    return [{'month': index % 12 + 1, 'year': index // 12}
+            for index in range(last - count + 1, last + 1)]
+
+def start_servers(args):
+    """
+    Start the Nexudus stub and the backend as subprocesses.
+
+    Args:
+        args (argparse.Namespace): Benchmark options
+
+    Returns:
+        tuple: (stub process, backend process, backend base URL)
+    """
+    stub_port, app_port = free_port(), free_port()
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(BENCH_DIR, 'nexudus_stub.py'),
+        '--port', str(stub_port),
+        '--teams', str(args.teams),
+        '--invoices-per-month', str(args.invoices_per_month),
+        '--months', str(max(args.months) + 2),
+        '--latency-ms', str(args.latency_ms),
+        '--latency-jitter-ms', str(args.latency_jitter_ms),
+        '--error-rate', str(args.error_rate),
+        '--throttle-rate', str(args.throttle_rate)
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    env = dict(os.environ,
+               NEXUDUS_API_BASE_URL=f"http://127.0.0.1:{stub_port}/api/",
+               SECRET_KEY='benchmark')
+    env.pop('INVOICE_MIRROR_DB', None)
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+
+    if args.server == 'gunicorn':
+        command = ['gunicorn', '--bind', f"127.0.0.1:{app_port}",
+                   '--workers', '1', '--threads', str(args.server_threads), 'app:app']
+    else:
+        command = [sys.executable, '-c',
+                   f"from app import app; app.run(host='127.0.0.1', port={app_port}, threaded=True)"]
+    backend = subprocess.Popen(command, cwd=APP_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f"http://127.0.0.1:{app_port}"
+    wait_until_up(f"http://127.0.0.1:{stub_port}/_stub/stats", stub)
+    wait_until_up(f"{base_url}/metrics", backend)
+    return stub, backend, base_url
+
+def login(base_url):
+    """Log in to the backend (the stub accepts any credentials) and return a Bearer header."""
+    response = requests.post(f"{base_url}/login",
+                             json={'email': 'bench@example.com', 'password': 'benchmark'},
+                             timeout=30)
+    response.raise_for_status()
+    return {'Authorization': f"Bearer {response.json()['token']}"}
+
+def run_scenario(base_url, auth, endpoint, months, concurrency, total_requests, teams):
+    """
+    Fire `total_requests` report requests with a fixed concurrency, each for
+    the next team of the synthetic dataset.
+
+    Args:
+        base_url (str): Backend base URL
+        auth (dict): Authorization header
+        endpoint (str): "get_invoices" or "generate_excel"
+        months (int): Report size in months
+        concurrency (int): Requests in flight at once
+        total_requests (int): Requests to send
+        teams (int): Teams in the synthetic dataset
+
+    Returns:
+        dict: Scenario results
+    """
+    report_months = recent_months(months)
+
+    def one_request(index):
+        payload = {'team_name': bench_team(index, teams), 'months': report_months,
+                   'freshness': 'live'}
+        started = time.perf_counter()
+        try:
+            response = requests.post(f"{base_url}/{endpoint}", json=payload,
+                                     headers=auth, timeout=300)
+            size = len(response.content)
+            ok = response.status_code == 200
+        except requests.exceptions.RequestException:
+            size, ok = 0, False
+        return time.perf_counter() - started, ok, size
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        started = time.perf_counter()
+        outcomes = list(executor.map(one_request, range(total_requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, ok, _ in outcomes if ok]
+    sizes = [size for _, ok, size in outcomes if ok]
+    return {
+        'endpoint': endpoint,
+        'months': months,
+        'concurrency': concurrency,
+        'requests': total_requests,
+        'errors': total_requests - len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 3) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        'response_bytes': max(sizes) if sizes else 0
+    }
+
+def scenario_key(scenario):
+    """Identify a scenario independently of its results."""
+    return (scenario['endpoint'], scenario['months'], scenario['concurrency'])
+
+def print_table(scenarios, baseline=None):
+    """
+    Print scenario results, with relative change against a baseline if given.
+
+    Args:
+        scenarios (list): Scenario results
+        baseline (dict): Baseline scenarios keyed by scenario_key()
+    """
+    print(f"{'endpoint':<16}{'months':>7}{'conc':>6}{'rps':>10}{'p50 ms':>10}"
+          f"{'p99 ms':>10}{'rss MB':>9}{'errors':>8}")
+    for scenario in scenarios:
+        line = (f"{scenario['endpoint']:<16}{scenario['months']:>7}{scenario['concurrency']:>6}"
+                f"{scenario['throughput_rps'] or 0:>10.2f}{scenario['p50_ms'] or 0:>10.1f}"
+                f"{scenario['p99_ms'] or 0:>10.1f}{scenario['peak_rss_mb']:>9.1f}"
+                f"{scenario['errors']:>8}")
+        previous = (baseline or {}).get(scenario_key(scenario))
+        if previous:
+            line += "  " + ", ".join(
+                f"{field} {change:+.0%}" for field, change in relative_changes(scenario, previous))
+        print(line)
+
+def relative_changes(scenario, previous):
+    """
+    Relative change of each headline metric versus a baseline scenario.
+
+    Returns:
+        list: [(field, change)] where a positive change is always worse
+    """
+    changes = []
+    for field, higher_is_better in (('throughput_rps', True), ('p50_ms', False),
+                                    ('p99_ms', False), ('peak_rss_mb', False)):
+        old, new = previous.get(field), scenario.get(field)
+        if old and new is not None:
+            change = (new - old) / old
+            changes.append((field, -change if higher_is_better else change))
+    return changes
+
+def find_regressions(scenarios, baseline, threshold):
+    """
+    List metrics that got worse than the baseline by more than `threshold`.
+
+    Args:
+        scenarios (list): Current scenario results
+        baseline (dict): Baseline scenarios keyed by scenario_key()
+        threshold (float): Allowed relative slowdown (0.15 = 15%)
+
+    Returns:
+        list: Human-readable regression descriptions
+    """
+    regressions = []
+    for scenario in scenarios:
+        previous = baseline.get(scenario_key(scenario))
+        if not previous:
+            continue
+        if scenario['errors'] > previous.get('errors', 0):
+            regressions.append(f"{scenario_key(scenario)} errors {previous.get('errors', 0)} -> "
+                               f"{scenario['errors']}")
+        for field, change in relative_changes(scenario, previous):
+            if change > threshold:
+                regressions.append(f"{scenario_key(scenario)} {field} worse by {change:.0%}")
+    return regressions
+
+def git_revision():
+    """Return the current git commit, or None outside a checkout."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Benchmark the CoMotion backend against the Nexudus stub')
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--months', nargs='+', type=int, default=[1, 6, 12],
+                        help='Report sizes to test, in months')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=20, help='Requests per scenario')
+    parser.add_argument('--teams', type=int, default=50)
+    parser.add_argument('--invoices-per-month', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--latency-jitter-ms', type=float, default=10)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--server', choices=('flask', 'gunicorn'), default='flask')
+    parser.add_argument('--server-threads', type=int, default=16,
+                        help='Worker threads when --server gunicorn')
+    parser.add_argument('--output', help='Results file (default: bench/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--regression-threshold', type=float, default=0.15,
+                        help='Relative slowdown that counts as a regression')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = {scenario_key(scenario): scenario
+                        for scenario in json.load(baseline_file)['scenarios']}
+
+    stub, backend, base_url = start_servers(args)
+    scenarios = []
+    try:
+        auth = login(base_url)
+        for endpoint in args.endpoints:
+            for months in args.months:
+                # Warm up connections and caches so the first scenario is not penalised
+                run_scenario(base_url, auth, endpoint, months, 1, 1, args.teams)
+                for concurrency in args.concurrency:
+                    with RSSSampler(backend.pid) as sampler:
+                        scenario = run_scenario(base_url, auth, endpoint, months,
+                                                concurrency, args.requests, args.teams)
+                    scenario['peak_rss_mb'] = round(sampler.peak / 2 ** 20, 1)
+                    scenarios.append(scenario)
+                    print(f"  {endpoint} months={months} concurrency={concurrency}: "
+                          f"{scenario['throughput_rps']} req/s, p99 {scenario['p99_ms']} ms")
+    finally:
+        backend.terminate()
+        stub.terminate()
+        backend.wait()
+        stub.wait()
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'config': {key: value for key, value in vars(args).items()
+                   if key not in ('output', 'compare')},
+        'scenarios': scenarios
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+
+    print()
+    print_table(scenarios, baseline)
+    print(f"\nResults saved to {output}")
+
+    if baseline is not None:
+        regressions = find_regressions(scenarios, baseline, args.regression_threshold)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
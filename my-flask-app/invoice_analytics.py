@@ -0,0 +1,189 @@
+"""
+CoMotion Financial Reports Automation - Invoice Analytics
+
+Vectorised pandas rollups of invoice gross amounts per team per month, the
+pivot staff used to build by hand from the exported spreadsheets. Rollups
+are computed from compact InvoiceRecord pages and can be combined, so a
+report can be aggregated page by page without holding every invoice.
+
+pandas is imported on first use, so worker processes that never build a
+rollup (login, team lists, invoice JSON, plain Excel reports) do not pay
+its import time and memory.
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+from datetime import date
+
+# Columns of a rollup frame
+ROLLUP_COLUMNS = ['team_name', 'month', 'total_gross', 'invoice_count']
+
+def rollup_invoices(records):
+    """
+    Aggregate invoices into gross totals and counts per team per month.
+
+    Args:
+        records (list): InvoiceRecord objects
+
+    Returns:
+        pandas.DataFrame: One row per (team_name, month) with ROLLUP_COLUMNS;
+            month is a monthly pandas Period
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(
+        [(r.Invoice_BillToName, r.Invoice_InvoiceFromDate, r.Invoice_TotalGrossAmount)
+         for r in records],
+        columns=['team_name', 'from_date', 'gross'])
+    if frame.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    from_dates = pd.to_datetime(frame['from_date'], utc=True, errors='coerce')
+    frame['month'] = from_dates.dt.tz_localize(None).dt.to_period('M')
+    frame['gross'] = pd.to_numeric(frame['gross'], errors='coerce').fillna(0.0)
+
+    return (frame.dropna(subset=['month'])
+                 .groupby(['team_name', 'month'], sort=True)
+                 .agg(total_gross=('gross', 'sum'), invoice_count=('gross', 'size'))
+                 .reset_index())
+
+def combine_rollups(frames):
+    """
+    Merge partial rollups (e.g. one per page) into a single rollup.
+
+    Args:
+        frames (list): Rollup DataFrames
+
+    Returns:
+        pandas.DataFrame: Summed rollup sorted by team and month
+    """
+    import pandas as pd
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    return (pd.concat(frames, ignore_index=True)
+              .groupby(['team_name', 'month'], sort=True)[['total_gross', 'invoice_count']]
+              .sum()
+              .reset_index())
+
+def add_month_over_month(rollup):
+    """
+    Add month-over-month change columns to a rollup.
+
+    The delta is only filled when the previous calendar month is present for
+    the same team; otherwise it is left empty.
+
+    Args:
+        rollup (pandas.DataFrame): Rollup with ROLLUP_COLUMNS
+
+    Returns:
+        pandas.DataFrame: Rollup with mom_delta and mom_pct columns added
+    """
+    import pandas as pd
+
+    rollup = rollup.sort_values(['team_name', 'month']).reset_index(drop=True)
+    if rollup.empty:
+        return rollup.assign(mom_delta=pd.Series(dtype=float), mom_pct=pd.Series(dtype=float))
+
+    by_team = rollup.groupby('team_name', sort=False)
+    previous_total = by_team['total_gross'].shift()
+    previous_month = by_team['month'].shift()
+    consecutive = previous_month.notna() & (previous_month == rollup['month'] - 1)
+
+    rollup['mom_delta'] = (rollup['total_gross'] - previous_total).where(consecutive)
+    rollup['mom_pct'] = (rollup['mom_delta'] / previous_total.where(previous_total != 0)).where(consecutive)
+    return rollup
+
+def within_one_month(records):
+    """
+    Keep the invoices whose billing period starts and ends in the same month.
+
+    A single-month query only returns such invoices, so totals built from
+    them do not depend on which other months were fetched alongside.
+
+    Args:
+        records (list): InvoiceRecord objects
+
+    Returns:
+        list: InvoiceRecord objects
+    """
+    return [r for r in records
+            if r.Invoice_InvoiceFromDate and r.Invoice_InvoiceToDate
+            and r.Invoice_InvoiceFromDate[:7] == r.Invoice_InvoiceToDate[:7]]
+
+def month_totals(records):
+    """
+    Gross total and invoice count per month, across every bill-to name.
+
+    Args:
+        records (list): InvoiceRecord objects of a single team
+
+    Returns:
+        dict: {(year, month): (total_gross: float, invoice_count: int)}
+    """
+    by_month = rollup_invoices(records).groupby('month')[['total_gross', 'invoice_count']].sum()
+    return {(period.year, period.month): (float(total), int(count))
+            for period, total, count in by_month.itertuples()}
+
+def rollup_from_month_totals(team_name, totals):
+    """
+    Build a one-team rollup from per-month totals.
+
+    Args:
+        team_name (str): Name of the team/company
+        totals (dict): {(year, month): (total_gross, invoice_count)}
+
+    Returns:
+        pandas.DataFrame: Rollup with ROLLUP_COLUMNS sorted by month
+    """
+    import pandas as pd
+
+    return pd.DataFrame(
+        [(team_name, pd.Period(year=year, month=month, freq='M'), total, count)
+         for (year, month), (total, count) in sorted(totals.items())],
+        columns=ROLLUP_COLUMNS)
+
+def rollup_to_records(rollup):
+    """
+    Convert a rollup into JSON-friendly dicts.
+
+    Args:
+        rollup (pandas.DataFrame): Rollup, optionally with month-over-month columns
+
+    Returns:
+        list: One dict per row with the month formatted as YYYY-MM
+    """
+    output = rollup.assign(month=rollup['month'].astype(str))
+    output = output.astype(object).where(output.notna(), None)
+    return output.to_dict(orient='records')
+
+def team_totals(rollup):
+    """
+    Total gross amount and invoice count per team across all months.
+
+    Args:
+        rollup (pandas.DataFrame): Rollup with ROLLUP_COLUMNS
+
+    Returns:
+        list: Dicts with team_name, total_gross and invoice_count
+    """
+    totals = rollup.groupby('team_name', sort=True)[['total_gross', 'invoice_count']].sum()
+    return totals.reset_index().to_dict(orient='records')
+
+def is_closed_month(year, month, today=None):
+    """
+    Check whether a month has ended (its invoices can no longer change).
+
+    Args:
+        year (int): Year
+        month (int): Month (1-12)
+        today (date): Reference date (defaults to today)
+
+    Returns:
+        bool: True if the month is before the current month
+    """
+    today = today or date.today()
+    return (year, month) < (today.year, today.month)
@@ -0,0 +1,250 @@
+"""
+CoMotion Financial Reports Automation - Streaming Invoice Exports
+
+Machine-readable alternatives to the Excel report for downstream finance
+tooling: NDJSON, CSV and Parquet. Each encoder consumes invoice pages as
+they arrive and yields bytes, so an export starts reaching the client while
+later pages are still being fetched and memory does not grow with the
+report. Columns use the same names as the Excel report.
+
+Text formats can be compressed on the fly with gzip or Brotli (negotiated
+from Accept-Encoding). Parquet is compressed internally per column, so it
+is sent without transfer compression.
+
+pyarrow (Parquet) and brotli are optional and only imported when used.
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+import csv
+import io
+import json
+import os
+import zlib
+
+# Export formats: name -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
+# Formats that benefit from transfer compression
+COMPRESSIBLE_FORMATS = ('ndjson', 'csv')
+
+# Compression effort: moderate levels keep streaming exports CPU-cheap
+EXPORT_GZIP_LEVEL = int(os.environ.get('EXPORT_GZIP_LEVEL', 6))
+EXPORT_BROTLI_QUALITY = int(os.environ.get('EXPORT_BROTLI_QUALITY', 5))
+
+# Parquet column compression and rows buffered per row group
+PARQUET_COMPRESSION = os.environ.get('PARQUET_COMPRESSION', 'zstd')
+PARQUET_ROW_GROUP_SIZE = int(os.environ.get('PARQUET_ROW_GROUP_SIZE', 50000))
+
+# Parquet column types by invoice field (every other field is a string)
+PARQUET_FIELD_TYPES = {
+    'RecordID': 'int64',
+    'Invoice_TotalGrossAmount': 'float64'
+}
+
+class ExportFormatUnavailable(Exception):
+    """Raised when an export format needs an optional package that is not installed."""
+
+def brotli_available():
+    """Return True if the optional brotli package can be imported."""
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def check_available(export_format):
+    """
+    Make sure the optional packages an export format needs are installed.
+
+    Args:
+        export_format (str): One of EXPORT_FORMATS
+
+    Raises:
+        ExportFormatUnavailable: If a required package is missing
+    """
+    if export_format == 'parquet':
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ExportFormatUnavailable("Parquet export requires the pyarrow package")
+
+def negotiate_encoding(accept_encodings, export_format):
+    """
+    Pick the transfer compression for an export from the client's Accept-Encoding.
+
+    Args:
+        accept_encodings (werkzeug.datastructures.Accept): Parsed Accept-Encoding header
+        export_format (str): Export format name
+
+    Returns:
+        str or None: 'br', 'gzip' or None for an uncompressed response
+    """
+    if export_format not in COMPRESSIBLE_FORMATS:
+        return None
+    offered = ['br', 'gzip'] if brotli_available() else ['gzip']
+    return accept_encodings.best_match(offered)
+
+def compress_chunks(chunks, encoding):
+    """
+    Compress a stream of byte chunks incrementally.
+
+    Args:
+        chunks (iterable): Byte chunks
+        encoding (str or None): 'br', 'gzip' or None to pass chunks through
+
+    Yields:
+        bytes: Compressed chunks
+    """
+    if encoding is None:
+        yield from chunks
+        return
+
+    if encoding == 'br':
+        import brotli
+
+        compressor = brotli.Compressor(quality=EXPORT_BROTLI_QUALITY)
+        compress, finish = compressor.process, compressor.finish
+    else:
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+        compress, finish = compressor.compress, compressor.flush
+
+    for chunk in chunks:
+        compressed = compress(chunk)
+        if compressed:
+            yield compressed
+    yield finish()
+
+def iter_ndjson(pages, column_mapping):
+    """
+    Encode invoice pages as newline-delimited JSON, one object per invoice.
+
+    Args:
+        pages (iterable): Lists of InvoiceRecord objects
+        column_mapping (dict): Invoice field -> report column name
+
+    Yields:
+        bytes: Encoded lines for one page
+    """
+    columns = list(column_mapping.values())
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for records in pages:
+        if records:
+            yield ''.join(encoder.encode(dict(zip(columns, invoice.values()))) + '\n'
+                          for invoice in records).encode('utf-8')
+
+def iter_csv(pages, column_mapping):
+    """
+    Encode invoice pages as CSV with a header row.
+
+    Args:
+        pages (iterable): Lists of InvoiceRecord objects
+        column_mapping (dict): Invoice field -> report column name
+
+    Yields:
+        bytes: Encoded rows for one page (the first chunk carries the header)
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(column_mapping.values())
+    for records in pages:
+        writer.writerows(invoice.values() for invoice in records)
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that collects bytes until they are drained."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def iter_parquet(pages, column_mapping):
+    """
+    Encode invoice pages as a Parquet file, one row group per
+    PARQUET_ROW_GROUP_SIZE invoices.
+
+    Args:
+        pages (iterable): Lists of InvoiceRecord objects
+        column_mapping (dict): Invoice field -> report column name
+
+    Yields:
+        bytes: Parts of the Parquet file as row groups are completed
+
+    Raises:
+        ExportFormatUnavailable: If pyarrow is not installed
+    """
+    check_available('parquet')
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fields = list(column_mapping)
+    schema = pa.schema([(column_mapping[field], getattr(pa, PARQUET_FIELD_TYPES.get(field, 'string'))())
+                        for field in fields])
+    sink = _ChunkSink()
+    columns = [[] for _ in fields]
+
+    def write_row_group(writer):
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=schema.field(idx).type) for idx, values in enumerate(columns)],
+            schema=schema))
+        for values in columns:
+            values.clear()
+
+    with pq.ParquetWriter(sink, schema, compression=PARQUET_COMPRESSION) as writer:
+        for records in pages:
+            for invoice in records:
+                for values, value in zip(columns, invoice.values()):
+                    values.append(value)
+            if len(columns[0]) >= PARQUET_ROW_GROUP_SIZE:
+                write_row_group(writer)
+                yield sink.drain()
+        if columns[0]:
+            write_row_group(writer)
+    yield sink.drain()
+
+ENCODERS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+    'parquet': iter_parquet
+}
+
+def iter_export(pages, export_format, column_mapping, encoding=None):
+    """
+    Encode and (optionally) compress invoice pages in an export format.
+
+    Args:
+        pages (iterable): Lists of InvoiceRecord objects
+        export_format (str): One of EXPORT_FORMATS
+        column_mapping (dict): Invoice field -> report column name
+        encoding (str or None): Transfer compression from negotiate_encoding()
+
+    Yields:
+        bytes: Response body chunks
+    """
+    yield from compress_chunks(ENCODERS[export_format](pages, column_mapping), encoding)
@@ -0,0 +1,378 @@
+"""
+CoMotion Financial Reports Automation - Local Invoice Mirror
+
+Keeps a local SQLite copy of Nexudus invoices and teams so report endpoints
+can be answered from an index on (bill-to name, from date) instead of
+crawling billing/invoices for every request. A sync job first copies the
+full collections, then pulls only records updated since the last watermark.
+Deletions do not show up in those incremental pulls, so every
+MIRROR_RECONCILE_INTERVAL_SECONDS a sync crawls each collection in full and
+drops records Nexudus no longer returns.
+
+Full records are kept in the shape Nexudus returns them (the `Records`
+payload), and the report fields also get their own columns so reads come
+back as compact InvoiceRecord objects without decoding any JSON.
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import nexudus_client
+from invoice_records import InvoiceRecord
+from upstream_scheduler import BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# Path of the SQLite mirror database (mirror is disabled when unset)
+MIRROR_DB_PATH = os.environ.get('INVOICE_MIRROR_DB', '')
+
+# How often the background job pulls changes from Nexudus
+MIRROR_SYNC_INTERVAL_SECONDS = int(os.environ.get('MIRROR_SYNC_INTERVAL_SECONDS', 300))
+
+# Oldest sync the endpoints will still answer from
+MIRROR_MAX_STALENESS_SECONDS = int(os.environ.get('MIRROR_MAX_STALENESS_SECONDS', 900))
+
+# Re-read window before each sync's start, covering records changed mid-crawl and clock skew
+MIRROR_SYNC_OVERLAP_SECONDS = int(os.environ.get('MIRROR_SYNC_OVERLAP_SECONDS', 300))
+
+# How often a sync re-reads each collection in full to remove deleted records
+MIRROR_RECONCILE_INTERVAL_SECONDS = int(os.environ.get('MIRROR_RECONCILE_INTERVAL_SECONDS', 86400))
+
+# Page size used while crawling Nexudus during a sync
+MIRROR_SYNC_PAGE_SIZE = int(os.environ.get('MIRROR_SYNC_PAGE_SIZE', 500))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    record_id INTEGER PRIMARY KEY,
+    bill_to_name TEXT,
+    from_date TEXT,
+    to_date TEXT,
+    gross_amount REAL,
+    reference TEXT,
+    updated_on TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_invoices_team_from ON invoices (bill_to_name, from_date);
+
+CREATE TABLE IF NOT EXISTS teams (
+    record_id INTEGER PRIMARY KEY,
+    name TEXT,
+    updated_on TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_teams_name ON teams (name);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    resource TEXT PRIMARY KEY,
+    watermark TEXT,
+    last_synced REAL,
+    last_reconciled REAL
+);
+"""
+
+# Nexudus collections mirrored locally: resource -> (API path, updated-on filter)
+RESOURCES = {
+    'invoices': ('billing/invoices', 'from_Invoice_UpdatedOn'),
+    'teams': ('spaces/teams', 'from_Team_UpdatedOn'),
+}
+
+def record_id(record):
+    """Return the RecordID of a Nexudus record (older payloads call it Id)."""
+    return record.get('RecordID') or record.get('Id')
+
+class InvoiceMirror:
+    """
+    SQLite-backed mirror of Nexudus invoices and teams.
+
+    Each thread gets its own connection; the database runs in WAL mode so
+    report reads never block on a sync in progress.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._connection().executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Add columns to mirrors created before they existed."""
+        conn = self._connection()
+        sync_columns = {row[1] for row in conn.execute('PRAGMA table_info(sync_state)')}
+        if 'last_reconciled' not in sync_columns:
+            # Mirrors without it are reconciled on their next sync
+            with self._write_lock, conn:
+                conn.execute('ALTER TABLE sync_state ADD COLUMN last_reconciled REAL')
+
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(invoices)')}
+        if {'gross_amount', 'reference'} <= columns:
+            return
+
+        with self._write_lock, conn:
+            for column, column_type in (('gross_amount', 'REAL'), ('reference', 'TEXT')):
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE invoices ADD COLUMN {column} {column_type}')
+            # Existing rows lack the new columns, so copy invoices again on the next sync
+            conn.execute("DELETE FROM sync_state WHERE resource = 'invoices'")
+        logger.info("Mirror schema upgraded; invoices will be fully re-synced")
+
+    def _connection(self):
+        """Return this thread's SQLite connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _upsert(self, resource, records):
+        """
+        Insert or replace a page of Nexudus records.
+
+        Args:
+            resource (str): 'invoices' or 'teams'
+            records (list): Records from a Nexudus page payload
+
+        Returns:
+            str or None: Latest UpdatedOn value seen in the page
+        """
+        if resource == 'invoices':
+            sql = ('INSERT OR REPLACE INTO invoices '
+                   '(record_id, bill_to_name, from_date, to_date, gross_amount, reference, '
+                   'updated_on, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?)')
+            rows = [(record_id(r), r.get('Invoice_BillToName'),
+                     r.get('Invoice_InvoiceFromDate'), r.get('Invoice_InvoiceToDate'),
+                     r.get('Invoice_TotalGrossAmount'), r.get('Invoice_Reference'),
+                     r.get('UpdatedOn'), json.dumps(r)) for r in records]
+        else:
+            sql = ('INSERT OR REPLACE INTO teams (record_id, name, updated_on, payload) '
+                   'VALUES (?, ?, ?, ?)')
+            rows = [(record_id(r), r.get('TeamName') or r.get('Name'),
+                     r.get('UpdatedOn'), json.dumps(r)) for r in records]
+
+        conn = self._connection()
+        with self._write_lock, conn:
+            conn.executemany(sql, rows)
+
+        return max((r.get('UpdatedOn') for r in records if r.get('UpdatedOn')), default=None)
+
+    def _delete_missing(self, resource, seen_ids):
+        """
+        Delete records that a full crawl of the collection did not return.
+
+        Args:
+            resource (str): 'invoices' or 'teams'
+            seen_ids (set): RecordIDs returned by the crawl
+
+        Returns:
+            int: Number of records deleted
+        """
+        conn = self._connection()
+        with self._write_lock, conn:
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS seen_ids (record_id INTEGER PRIMARY KEY)')
+            conn.execute('DELETE FROM seen_ids')
+            conn.executemany('INSERT OR IGNORE INTO seen_ids VALUES (?)', ((i,) for i in seen_ids))
+            deleted = conn.execute(f'DELETE FROM {resource} WHERE record_id NOT IN '
+                                   '(SELECT record_id FROM seen_ids)').rowcount
+            conn.execute('DELETE FROM seen_ids')
+        return deleted
+
+    def _sync_state(self, resource):
+        """Return (watermark, last_synced, last_reconciled) for a resource."""
+        row = self._connection().execute(
+            'SELECT watermark, last_synced, last_reconciled FROM sync_state WHERE resource = ?',
+            (resource,)).fetchone()
+        return row if row else (None, None, None)
+
+    def _save_sync_state(self, resource, watermark, synced_at, reconciled_at):
+        """Record the watermark and completion time of a successful sync."""
+        conn = self._connection()
+        with self._write_lock, conn:
+            conn.execute('INSERT OR REPLACE INTO sync_state '
+                         '(resource, watermark, last_synced, last_reconciled) VALUES (?, ?, ?, ?)',
+                         (resource, watermark, synced_at, reconciled_at))
+
+    def sync(self, headers):
+        """
+        Pull new and changed records from Nexudus into the mirror.
+
+        The first run copies each collection in full; later runs only request
+        records whose UpdatedOn is at or after the stored watermark. Once
+        MIRROR_RECONCILE_INTERVAL_SECONDS have passed since the last full
+        crawl, the collection is crawled in full again and records that are
+        no longer returned (deleted or voided in Nexudus) are removed.
+
+        The crawl is not ordered by UpdatedOn, so a record on an early page
+        can change after a later page was read. The stored watermark is
+        therefore never later than the sync's start time minus
+        MIRROR_SYNC_OVERLAP_SECONDS, and such changes are picked up next time.
+
+        Args:
+            headers (dict): Authorization headers of the sync account
+
+        Returns:
+            dict: Number of records written per resource
+        """
+        written = {}
+        for resource, (path, updated_filter) in RESOURCES.items():
+            watermark, _, reconciled_at = self._sync_state(resource)
+            started_at = time.time()
+            full = (watermark is None or reconciled_at is None
+                    or started_at - reconciled_at >= MIRROR_RECONCILE_INTERVAL_SECONDS)
+            params = {'dir': 'Ascending'}
+            if not full:
+                params[updated_filter] = watermark
+
+            count = 0
+            seen_ids = set()
+            for records in nexudus_client.iter_pages(path, headers, params, MIRROR_SYNC_PAGE_SIZE,
+                                                     priority=BACKGROUND):
+                if not records:
+                    continue
+                if full:
+                    seen_ids.update(record_id(r) for r in records)
+                page_watermark = self._upsert(resource, records)
+                if page_watermark and (watermark is None or page_watermark > watermark):
+                    watermark = page_watermark
+                count += len(records)
+
+            # Upserts are idempotent, so re-reading the overlap window is harmless
+            cap = datetime.fromtimestamp(started_at - MIRROR_SYNC_OVERLAP_SECONDS,
+                                         timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+            if watermark and watermark[:len(cap)] > cap:
+                watermark = cap
+
+            if full:
+                # Only reached when the crawl completed, so every live record was seen
+                deleted = self._delete_missing(resource, seen_ids)
+                reconciled_at = started_at
+                logger.info(f"Mirror reconciliation of {resource}: removed {deleted} records")
+
+            self._save_sync_state(resource, watermark, started_at, reconciled_at)
+            written[resource] = count
+            logger.info(f"Mirror sync of {resource}: {count} records (watermark {watermark})")
+
+        return written
+
+    def last_synced(self):
+        """
+        Return when the mirror was last fully synced.
+
+        Returns:
+            float or None: Unix timestamp of the oldest resource sync, or None
+        """
+        rows = self._connection().execute('SELECT resource, last_synced FROM sync_state').fetchall()
+        synced = {resource: last_synced for resource, last_synced in rows}
+        if any(synced.get(resource) is None for resource in RESOURCES):
+            return None
+        return min(synced.values())
+
+    def is_fresh(self, max_staleness=None):
+        """
+        Check whether the mirror is recent enough to answer reads.
+
+        Args:
+            max_staleness (int): Maximum sync age in seconds
+                (defaults to MIRROR_MAX_STALENESS_SECONDS)
+
+        Returns:
+            bool: True if every resource synced within max_staleness
+        """
+        last_synced = self.last_synced()
+        if last_synced is None:
+            return False
+        limit = MIRROR_MAX_STALENESS_SECONDS if max_staleness is None else max_staleness
+        return time.time() - last_synced <= limit
+
+    def query_invoices(self, team_name, ranges):
+        """
+        Read a team's invoices for a set of date ranges from the local index.
+
+        Matches the live filters: the invoice must start on or after the first
+        day and end on or before the last day of a range.
+
+        Args:
+            team_name (str): Name of the team/company
+            ranges (list): (start_date, end_date) tuples in YYYY-MM-DD format
+
+        Returns:
+            list: InvoiceRecord objects in chronological order
+        """
+        conn = self._connection()
+        invoices = []
+        for start_date, end_date in ranges:
+            # Compare against the following day so any time/zone suffix on to_date still matches
+            day_after = (date.fromisoformat(end_date) + timedelta(days=1)).isoformat()
+            rows = conn.execute(
+                'SELECT record_id, bill_to_name, from_date, to_date, gross_amount, reference '
+                'FROM invoices WHERE bill_to_name = ? AND from_date >= ? AND from_date < ? AND to_date < ? '
+                'ORDER BY from_date, record_id',
+                (team_name, start_date, day_after, day_after)).fetchall()
+            invoices.extend(InvoiceRecord(*row) for row in rows)
+        return invoices
+
+    def list_teams(self):
+        """
+        Return every mirrored team sorted by name.
+
+        Returns:
+            list: Team records
+        """
+        rows = self._connection().execute('SELECT payload FROM teams ORDER BY name').fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def matches_team_catalogue(self, team_ids, total_items):
+        """
+        Check a caller's view of spaces/teams against the mirrored catalogue.
+
+        Team IDs are unique across Nexudus businesses, so an account of
+        another business (or one that sees only part of the catalogue) fails.
+
+        Args:
+            team_ids (list): RecordIDs of teams the caller can see
+            total_items (int): Caller's TotalItems for spaces/teams
+
+        Returns:
+            bool: True if every ID is mirrored and the team counts agree
+        """
+        conn = self._connection()
+        if not team_ids or total_items != conn.execute('SELECT COUNT(*) FROM teams').fetchone()[0]:
+            return False
+        placeholders = ', '.join('?' * len(team_ids))
+        found = conn.execute(f'SELECT COUNT(*) FROM teams WHERE record_id IN ({placeholders})',
+                             team_ids).fetchone()[0]
+        return found == len(set(team_ids))
+
+    def start_background_sync(self, headers, interval=None):
+        """
+        Start a daemon thread that keeps the mirror in sync.
+
+        Args:
+            headers (dict): Authorization headers of the sync account
+            interval (int): Seconds between syncs (defaults to MIRROR_SYNC_INTERVAL_SECONDS)
+
+        Returns:
+            threading.Thread: The started sync thread
+        """
+        interval = interval or MIRROR_SYNC_INTERVAL_SECONDS
+
+        def run():
+            while True:
+                try:
+                    self.sync(headers)
+                except Exception as e:
+                    logger.error(f"Mirror sync failed: {str(e)}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name='invoice-mirror-sync', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,85 @@
+"""
+CoMotion Financial Reports Automation - Compact Invoice Records
+
+Nexudus invoice payloads carry dozens of fields, but reports only use the
+handful in INVOICE_FIELDS. Pages are projected onto InvoiceRecord (a
+__slots__ class) as soon as they are decoded, so the full dicts can be freed
+straight away and downstream code works with small fixed-layout objects.
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+# Invoice fields kept from Nexudus payloads, in report column order
+INVOICE_FIELDS = (
+    'RecordID',
+    'Invoice_BillToName',
+    'Invoice_InvoiceFromDate',
+    'Invoice_InvoiceToDate',
+    'Invoice_TotalGrossAmount',
+    'Invoice_Reference'
+)
+
+class InvoiceRecord:
+    """
+    Projection of a Nexudus invoice onto the fields used by reports.
+
+    Instances have no per-object __dict__, which keeps them a fraction of the
+    size of the decoded JSON dicts they replace.
+    """
+
+    __slots__ = INVOICE_FIELDS
+
+    def __init__(self, *values):
+        for field, value in zip(INVOICE_FIELDS, values):
+            setattr(self, field, value)
+
+    @classmethod
+    def from_nexudus(cls, invoice):
+        """
+        Project a decoded Nexudus invoice dict.
+
+        Args:
+            invoice (dict): Invoice as returned in a Records payload
+
+        Returns:
+            InvoiceRecord: Compact record
+        """
+        record = cls.__new__(cls)
+        for field in INVOICE_FIELDS:
+            setattr(record, field, invoice.get(field))
+        return record
+
+    @classmethod
+    def project_page(cls, records):
+        """
+        Project every invoice in a page.
+
+        Args:
+            records (list): Decoded Nexudus invoice dicts
+
+        Returns:
+            list: InvoiceRecord objects
+        """
+        return [cls.from_nexudus(invoice) for invoice in records]
+
+    def values(self):
+        """
+        Return the field values in INVOICE_FIELDS order.
+
+        Returns:
+            tuple: Field values
+        """
+        return tuple(getattr(self, field) for field in INVOICE_FIELDS)
+
+    def to_dict(self):
+        """
+        Convert to a plain dict for JSON responses.
+
+        Returns:
+            dict: Field name to value
+        """
+        return {field: getattr(self, field) for field in INVOICE_FIELDS}
+
+    def __repr__(self):
+        return f"InvoiceRecord({self.RecordID!r}, {self.Invoice_BillToName!r})"
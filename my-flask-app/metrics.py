@@ -0,0 +1,125 @@
+"""
+CoMotion Financial Reports Automation - Prometheus Metrics
+
+Metric definitions and small timing helpers shared by the Flask app and the
+Nexudus client. Everything is exposed on the /metrics endpoint.
+
+When the backend runs under gunicorn with several worker processes, set
+PROMETHEUS_MULTIPROC_DIR to an empty writable directory so /metrics
+aggregates the samples of every worker.
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter,
+                               Gauge, Histogram, generate_latest)
+
+# Latency buckets (seconds) spanning quick cache hits to multi-minute reports
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Excel file size buckets (bytes), 8 KB up to 128 MB
+SIZE_BUCKETS = tuple(8192 * 4 ** exponent for exponent in range(8))
+
+REQUEST_LATENCY = Histogram(
+    'comotion_http_request_duration_seconds', 'Latency of backend endpoints',
+    ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    'comotion_http_requests_in_flight', 'Backend requests currently being served',
+    multiprocess_mode='livesum')
+
+UPSTREAM_LATENCY = Histogram(
+    'comotion_upstream_request_duration_seconds', 'Latency of individual Nexudus API attempts',
+    ['endpoint', 'status'], buckets=LATENCY_BUCKETS)
+
+UPSTREAM_RETRIES = Counter(
+    'comotion_upstream_retries_total', 'Nexudus API attempts that were retried',
+    ['endpoint', 'reason'])
+
+UPSTREAM_TIMEOUTS = Counter(
+    'comotion_upstream_timeouts_total', 'Nexudus API attempts that timed out',
+    ['endpoint'])
+
+UPSTREAM_QUEUE_WAIT = Histogram(
+    'comotion_upstream_queue_wait_seconds', 'Time Nexudus attempts waited for the rate limiter',
+    ['priority'], buckets=LATENCY_BUCKETS)
+
+UPSTREAM_COALESCED = Counter(
+    'comotion_upstream_coalesced_total', 'Nexudus requests answered by an identical in-flight call',
+    ['endpoint'])
+
+CACHE_REQUESTS = Counter(
+    'comotion_cache_requests_total', 'Cache lookups by cache and result',
+    ['cache', 'result'])
+
+STAGE_LATENCY = Histogram(
+    'comotion_stage_duration_seconds', 'Duration of internal report stages',
+    ['stage'], buckets=LATENCY_BUCKETS)
+
+EXCEL_BYTES = Histogram(
+    'comotion_excel_bytes', 'Size of generated report files',
+    ['kind'], buckets=SIZE_BUCKETS)
+
+def record_cache(cache, hit):
+    """
+    Count a cache lookup.
+
+    Args:
+        cache (str): Cache name
+        hit (bool): Whether the lookup was served from the cache
+    """
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+@contextmanager
+def time_stage(stage):
+    """
+    Time a block of code as a report stage.
+
+    Args:
+        stage (str): Stage name used as the metric label
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(stage=stage).observe(time.perf_counter() - started)
+
+def timed(stage):
+    """
+    Decorator form of time_stage.
+
+    Args:
+        stage (str): Stage name used as the metric label
+
+    Returns:
+        callable: Decorator that times every call of the wrapped function
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with time_stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def render_latest():
+    """
+    Render every metric in the Prometheus text format.
+
+    Returns:
+        tuple: (body: bytes, content_type: str)
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
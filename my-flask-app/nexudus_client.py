@@ -0,0 +1,295 @@
+"""
+CoMotion Financial Reports Automation - Nexudus API Client
+
+Shared upstream client used by every endpoint that talks to the Nexudus API.
+A single pooled requests.Session keeps TCP+TLS connections to Nexudus alive
+between calls, and transient failures (connection errors, 429 and 5xx
+responses) are retried with jittered exponential backoff that honours any
+Retry-After header sent by Nexudus. Every attempt is admitted by the
+process-wide upstream scheduler (rate limit and priorities), and identical
+concurrent requests share a single upstream call.
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from upstream_scheduler import INTERACTIVE, PRIORITY_NAMES, SingleFlight, UpstreamScheduler
+
+try:
+    import orjson  # Optional: several times faster than json for large pages
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Nexudus API base URL for CoMotion workspace management
+BASE_URL = os.environ.get('NEXUDUS_API_BASE_URL', 'https://spaces.nexudus.com/api/')
+
+# Connection pool sizing (connections kept alive per host)
+POOL_MAXSIZE = int(os.environ.get('NEXUDUS_POOL_MAXSIZE', 32))
+
+# Retry policy for transient upstream failures
+MAX_RETRIES = int(os.environ.get('NEXUDUS_MAX_RETRIES', 3))
+BACKOFF_BASE = float(os.environ.get('NEXUDUS_BACKOFF_BASE', 0.5))
+BACKOFF_MAX = float(os.environ.get('NEXUDUS_BACKOFF_MAX', 10))
+RETRY_AFTER_MAX = float(os.environ.get('NEXUDUS_RETRY_AFTER_MAX', 30))
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Process-wide upstream rate limit (requests per second, 0 disables) and burst size
+RATE_LIMIT = float(os.environ.get('NEXUDUS_RATE_LIMIT', 20))
+RATE_BURST = int(os.environ.get('NEXUDUS_RATE_BURST', 40))
+
+# Default (connect, read) timeout in seconds for a single attempt
+DEFAULT_TIMEOUT = (3.05, 10)
+
+class NexudusAPIError(Exception):
+    """Raised when Nexudus answers a paged request with a non-success status."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _build_session():
+    """
+    Create the shared Nexudus session with a tuned keep-alive connection pool.
+
+    Returns:
+        requests.Session: Session with pooled adapters mounted
+    """
+    session = requests.Session()
+    # Retries are handled in get() so backoff and Retry-After are under our control
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE,
+                          max_retries=0, pool_block=False)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept': 'application/json', 'Connection': 'keep-alive'})
+    return session
+
+_session = _build_session()
+
+_scheduler = UpstreamScheduler(RATE_LIMIT, RATE_BURST)
+_inflight = SingleFlight()
+
+def _parse_retry_after(response):
+    """
+    Read the Retry-After header of a throttled response.
+
+    Args:
+        response (requests.Response): Upstream response
+
+    Returns:
+        float or None: Seconds to wait, or None if absent/unparseable
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def _backoff_delay(attempt, response=None):
+    """
+    Compute how long to wait before the next attempt.
+
+    Args:
+        attempt (int): Zero-based number of the attempt that just failed
+        response (requests.Response): Failed response, if one was received
+
+    Returns:
+        float: Delay in seconds
+    """
+    if response is not None:
+        retry_after = _parse_retry_after(response)
+        if retry_after is not None:
+            return min(retry_after, RETRY_AFTER_MAX)
+
+    # Full jitter keeps concurrent workers from retrying in lockstep
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def get(path, headers=None, params=None, timeout=None, priority=INTERACTIVE):
+    """
+    Send a GET request to the Nexudus API over the shared connection pool.
+
+    Connection errors and 429/5xx responses are retried up to MAX_RETRIES
+    times. The final response is returned as-is (callers still check
+    response.ok), and the final connection error or timeout is re-raised.
+
+    A request identical to one already in flight (same headers, path, params
+    and priority) waits for that call and receives the same response object,
+    so callers must treat responses as read-only. Priority is part of the
+    identity so an interactive call never queues behind a batch leader.
+
+    Args:
+        path (str): API path relative to BASE_URL (e.g. 'spaces/teams')
+        headers (dict): Request headers, typically the Authorization header
+        params (dict): Query string parameters
+        timeout (float or tuple): Per-attempt timeout (defaults to DEFAULT_TIMEOUT)
+        priority (int): Scheduling priority (upstream_scheduler.INTERACTIVE,
+            BATCH or BACKGROUND)
+
+    Returns:
+        requests.Response: Upstream response
+    """
+    key = (path, tuple(sorted((headers or {}).items())), tuple(sorted((params or {}).items())),
+           priority)
+    response, shared = _inflight.do(
+        key, lambda: _get_with_retries(path, headers, params, timeout, priority))
+    if shared:
+        metrics.UPSTREAM_COALESCED.labels(endpoint=path).inc()
+    return response
+
+def _get_with_retries(path, headers, params, timeout, priority):
+    """Send one logical GET request, retrying transient failures (see get())."""
+    url = f"{BASE_URL}{path}"
+
+    for attempt in range(MAX_RETRIES + 1):
+        waited = _scheduler.acquire(priority)
+        metrics.UPSTREAM_QUEUE_WAIT.labels(priority=PRIORITY_NAMES[priority]).observe(waited)
+
+        started = time.perf_counter()
+        try:
+            response = _session.get(url, headers=headers, params=params,
+                                    timeout=timeout or DEFAULT_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            failure = 'timeout' if isinstance(e, requests.exceptions.Timeout) else 'connection_error'
+            metrics.UPSTREAM_LATENCY.labels(endpoint=path, status=failure).observe(
+                time.perf_counter() - started)
+            if failure == 'timeout':
+                metrics.UPSTREAM_TIMEOUTS.labels(endpoint=path).inc()
+            if not isinstance(e, requests.exceptions.ConnectionError) or attempt >= MAX_RETRIES:
+                raise
+            metrics.UPSTREAM_RETRIES.labels(endpoint=path, reason=failure).inc()
+            delay = _backoff_delay(attempt)
+            logger.warning(f"Nexudus {path} connection error ({e.__class__.__name__}), "
+                           f"retrying in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+
+        metrics.UPSTREAM_LATENCY.labels(endpoint=path, status=response.status_code).observe(
+            time.perf_counter() - started)
+
+        if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+            metrics.UPSTREAM_RETRIES.labels(endpoint=path, reason=response.status_code).inc()
+            delay = _backoff_delay(attempt, response)
+            if response.status_code == 429:
+                # Throttling applies to the whole account: hold back every caller
+                _scheduler.pause(delay)
+            logger.warning(f"Nexudus {path} returned {response.status_code}, "
+                           f"retrying in {delay:.2f}s")
+            response.close()
+            time.sleep(delay)
+            continue
+
+        return response
+
+def decode_json(response):
+    """
+    Decode a JSON response body, using orjson when it is installed.
+
+    Args:
+        response (requests.Response): Upstream response
+
+    Returns:
+        object: Decoded JSON value
+    """
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+def fetch_page(path, headers, params, page, size, project=None, priority=INTERACTIVE):
+    """
+    Fetch a single page of a paginated Nexudus collection.
+
+    Args:
+        path (str): API path relative to BASE_URL (e.g. 'billing/invoices')
+        headers (dict): Authorization headers for API requests
+        params (dict): Filter parameters (without paging)
+        page (int): 1-based page number
+        size (int): Records per page
+        project (callable): Optional transform applied to the page's Records
+            as soon as it is decoded
+        priority (int): Scheduling priority of the request
+
+    Returns:
+        dict: Decoded Nexudus page payload
+
+    Raises:
+        NexudusAPIError: If Nexudus returns a non-success status
+    """
+    page_params = dict(params or {}, page=page, size=size)
+    response = get(path, headers=headers, params=page_params, priority=priority)
+
+    if not response.ok:
+        logger.error(f"API error for {path} page {page}: {response.status_code}")
+        raise NexudusAPIError(f"Failed to fetch {path} (page {page}): {response.text}",
+                              status_code=response.status_code)
+
+    payload = decode_json(response)
+    if project is not None:
+        payload['Records'] = project(payload.get('Records', []))
+    return payload
+
+def iter_pages(path, headers, params, size, project=None, priority=INTERACTIVE):
+    """
+    Yield the records of every page of a paginated Nexudus collection.
+
+    The request for page N+1 is issued as soon as page N arrives, so the
+    network round-trip overlaps with whatever the caller does with page N.
+
+    Args:
+        path (str): API path relative to BASE_URL
+        headers (dict): Authorization headers for API requests
+        params (dict): Filter parameters (without paging)
+        size (int): Records per page
+        project (callable): Optional transform applied to each page's Records
+            (runs on the prefetch thread)
+        priority (int): Scheduling priority of the page requests
+
+    Yields:
+        list: Records for one page
+    """
+    prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='nexudus-prefetch')
+    page = 1
+    pending = prefetcher.submit(fetch_page, path, headers, params, page, size, project,
+                                priority)
+    try:
+        while pending is not None:
+            payload = pending.result()
+            records = payload.get('Records', [])
+
+            # Prefer the explicit paging flag; fall back to a full-page check
+            has_next = payload.get('HasNextPage')
+            if has_next is None:
+                has_next = len(records) >= size
+
+            pending = None
+            if has_next and records:
+                page += 1
+                pending = prefetcher.submit(fetch_page, path, headers, params, page, size,
+                                            project, priority)
+
+            yield records
+    finally:
+        if pending is not None:
+            pending.cancel()
+        prefetcher.shutdown(wait=False)
@@ -0,0 +1,209 @@
+"""
+CoMotion Financial Reports Automation - Background Report Jobs
+
+Runs long report builds on a background worker pool so a request only has to
+submit the job and later poll its status and download the finished file.
+Identical submissions that are still queued or running share one job, and
+finished files are kept until a retention period expires.
+
+Jobs live in the memory of the process that accepted them, so the backend
+must run as a single (multi-threaded) worker process or behind sticky
+sessions for polling and downloads to reach the same process.
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Number of reports built concurrently in the background
+REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', 2))
+
+# How long finished jobs (and their files) stay available
+REPORT_JOB_RETENTION_SECONDS = int(os.environ.get('REPORT_JOB_RETENTION_SECONDS', 3600))
+
+# Where finished report files are stored (a private temp dir when unset)
+REPORT_JOB_DIR = os.environ.get('REPORT_JOB_DIR') or None
+
+# Job lifecycle states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+class ReportJobError(Exception):
+    """Raised by a job runner to fail a job with a user-facing message."""
+
+class ReportJob:
+    """
+    State of one submitted report.
+
+    Attributes:
+        job_id (str): Public job identifier
+        owner (str): Credential key of the submitting user
+        dedupe_key (tuple): Identity used to share in-flight submissions
+        filename (str): Download filename of the finished report
+        status (str): One of QUEUED, RUNNING, DONE, FAILED
+        progress (dict): Runner-reported progress (stage, counts, ...)
+        error (str or None): Failure message
+        result_path (str): Path the runner writes the report to
+    """
+
+    def __init__(self, owner, dedupe_key, filename, result_path):
+        self.job_id = uuid.uuid4().hex
+        self.owner = owner
+        self.dedupe_key = dedupe_key
+        self.filename = filename
+        self.result_path = result_path
+        self.status = QUEUED
+        self.progress = {'stage': QUEUED}
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def update_progress(self, **fields):
+        """Merge progress fields reported by the runner."""
+        self.progress = dict(self.progress, **fields)
+
+    @property
+    def expires_at(self):
+        """Unix time after which a finished job is discarded (None while in flight)."""
+        if self.finished_at is None:
+            return None
+        return self.finished_at + REPORT_JOB_RETENTION_SECONDS
+
+    def to_dict(self):
+        """
+        Describe the job for the status endpoint.
+
+        Returns:
+            dict: JSON-serialisable job status
+        """
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'progress': self.progress,
+            'error': self.error,
+            'filename': self.filename,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+            'expires_at': self.expires_at
+        }
+
+class ReportJobManager:
+    """
+    Queue of report jobs executed on a background thread pool.
+
+    Args:
+        workers (int): Number of jobs run concurrently
+        result_dir (str): Directory for finished report files
+    """
+
+    def __init__(self, workers=REPORT_JOB_WORKERS, result_dir=REPORT_JOB_DIR):
+        self.result_dir = result_dir or tempfile.mkdtemp(prefix='comotion-reports-')
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-job')
+        self._jobs = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, owner, dedupe_key, filename, runner):
+        """
+        Queue a report, or join an identical one that is still in flight.
+
+        Args:
+            owner (str): Credential key of the submitting user
+            dedupe_key (tuple): Identity of the report (without the owner)
+            filename (str): Download filename of the finished report
+            runner (callable): Called as runner(job); writes job.result_path
+
+        Returns:
+            tuple: (job: ReportJob, created: bool)
+        """
+        self.cleanup()
+        key = (owner,) + tuple(dedupe_key)
+
+        with self._lock:
+            existing = self._inflight.get(key)
+            if existing is not None:
+                return existing, False
+
+            job = ReportJob(owner, key, filename, None)
+            job.result_path = os.path.join(self.result_dir, f"{job.job_id}.report")
+            self._jobs[job.job_id] = job
+            self._inflight[key] = job
+
+        self._executor.submit(self._run, job, runner)
+        logger.info(f"Queued report job {job.job_id} ({filename})")
+        return job, True
+
+    def _run(self, job, runner):
+        """Execute a job's runner and record the outcome."""
+        job.status = RUNNING
+        job.update_progress(stage=RUNNING)
+        try:
+            runner(job)
+            job.status = DONE
+            job.update_progress(stage=DONE)
+            logger.info(f"Report job {job.job_id} finished")
+        except ReportJobError as e:
+            job.status = FAILED
+            job.error = str(e)
+            logger.warning(f"Report job {job.job_id} failed: {str(e)}")
+        except Exception as e:
+            job.status = FAILED
+            job.error = 'An unexpected error occurred while generating the report.'
+            logger.error(f"Report job {job.job_id} crashed: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+            if job.status == FAILED:
+                self._remove_file(job)
+            with self._lock:
+                if self._inflight.get(job.dedupe_key) is job:
+                    del self._inflight[job.dedupe_key]
+
+    def get(self, job_id, owner):
+        """
+        Look up a job belonging to a user.
+
+        Args:
+            job_id (str): Public job identifier
+            owner (str): Credential key of the requesting user
+
+        Returns:
+            ReportJob or None: The job, or None if unknown, expired or not theirs
+        """
+        self.cleanup()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.owner != owner:
+            return None
+        return job
+
+    def cleanup(self):
+        """Discard finished jobs whose retention period has expired."""
+        now = time.time()
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.expires_at is not None and job.expires_at <= now]
+            for job in expired:
+                del self._jobs[job.job_id]
+        for job in expired:
+            self._remove_file(job)
+
+    @staticmethod
+    def _remove_file(job):
+        """Delete a job's report file if it exists."""
+        try:
+            os.remove(job.result_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove report file for job {job.job_id}: {str(e)}")
@@ -0,0 +1,103 @@
+"""
+CoMotion Financial Reports Automation - Login Sessions
+
+After /login has verified a user's credentials against Nexudus, the user is
+given a short-lived signed session token. Later requests present the token
+instead of their email/password: the signature and expiry are checked
+locally, and the upstream Authorization header is taken from a server-side
+session cache with TTL eviction. Bad or expired tokens are rejected without
+a Nexudus round-trip.
+
+Sessions live in the memory of the process that issued them; with several
+worker processes set SECRET_KEY and use sticky sessions (or a single
+multi-threaded worker), otherwise users will be asked to log in again.
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+import logging
+import os
+import secrets
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Lifetime of a session token and its cached credentials
+SESSION_TTL_SECONDS = int(os.environ.get('SESSION_TTL_SECONDS', 3600))
+
+# Maximum number of live sessions kept per process
+SESSION_MAX_ACTIVE = int(os.environ.get('SESSION_MAX_ACTIVE', 10000))
+
+class SessionStore:
+    """
+    Issues signed session tokens and maps them to upstream credentials.
+
+    Args:
+        secret_key (str): Key used to sign tokens (random per process when empty)
+        ttl (int): Session lifetime in seconds
+        maxsize (int): Maximum number of live sessions
+    """
+
+    def __init__(self, secret_key=None, ttl=SESSION_TTL_SECONDS, maxsize=SESSION_MAX_ACTIVE):
+        if not secret_key:
+            logger.warning("SECRET_KEY is not set; session tokens will not survive a restart")
+            secret_key = secrets.token_hex(32)
+        self.ttl = ttl
+        self._serializer = URLSafeTimedSerializer(secret_key, salt='comotion-session')
+        self._sessions = TTLCache(maxsize=maxsize, ttl=ttl, name='sessions')
+
+    def create(self, email, authorization, credential_key):
+        """
+        Start a session for credentials that Nexudus has just accepted.
+
+        Args:
+            email (str): User's email (for logging)
+            authorization (str): Upstream Authorization header value
+            credential_key (str): Hash identifying the credentials
+
+        Returns:
+            str: Signed session token
+        """
+        session_id = secrets.token_urlsafe(24)
+        self._sessions.set(session_id, {
+            'email': email,
+            'authorization': authorization,
+            'credential_key': credential_key
+        })
+        return self._serializer.dumps(session_id)
+
+    def resolve(self, token):
+        """
+        Look up the session behind a token, checking signature and expiry locally.
+
+        Args:
+            token (str): Token issued by create()
+
+        Returns:
+            dict or None: Session data, or None if the token is invalid or expired
+        """
+        try:
+            session_id = self._serializer.loads(token, max_age=self.ttl)
+        except (SignatureExpired, BadSignature):
+            return None
+        return self._sessions.get(session_id)
+
+    def revoke(self, token):
+        """
+        End the session behind a token.
+
+        Args:
+            token (str): Token issued by create()
+
+        Returns:
+            bool: True if a live session was removed
+        """
+        try:
+            session_id = self._serializer.loads(token, max_age=self.ttl)
+        except (SignatureExpired, BadSignature):
+            return False
+        return self._sessions.invalidate(session_id)
@@ -0,0 +1,102 @@
+"""
+CoMotion Financial Reports Automation - Team Search Index
+
+In-memory prefix index over the team catalogue for type-ahead search.
+Every word of a team name is a search entry point, so "cof" finds both
+"Coffee Lab" and "The Coffee Company". Entries are kept in one sorted list
+of lower-cased keys; a prefix lookup is two binary searches plus the
+matches, with no per-keystroke scan of the catalogue.
+
+The index is immutable: when the catalogue is crawled again a new index is
+built and swapped in, so lookups need no locking.
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+import re
+from bisect import bisect_left
+from functools import lru_cache
+
+# Team fields returned to the browser for each match
+TEAM_SEARCH_FIELDS = ('RecordID', 'TeamName')
+
+# Distinct queries whose matches are kept per index
+MATCH_CACHE_SIZE = 1024
+
+# Characters that start a new searchable word inside a team name
+WORD_START = re.compile(r'(?:^|(?<=[\s\-_/&.,(]))\w', re.UNICODE)
+
+def normalise(text):
+    """Fold case and collapse whitespace so names and queries compare alike."""
+    return ' '.join((text or '').split()).casefold()
+
+class TeamIndex:
+    """
+    Case-insensitive prefix index over team names.
+
+    Args:
+        teams (list): Team records (Nexudus 'TeamName' field is indexed)
+    """
+
+    def __init__(self, teams):
+        self.teams = sorted(teams, key=lambda team: normalise(team.get('TeamName')))
+
+        # Teams are sorted by name, so whole-name matches are a contiguous slice
+        self._names = [normalise(team.get('TeamName')) for team in self.teams]
+
+        words = []
+        for position, name in enumerate(self._names):
+            for match in WORD_START.finditer(name):
+                if match.start() > 0:
+                    words.append((name[match.start():], position))
+        words.sort()
+        self._word_keys = [key for key, _ in words]
+        self._word_positions = [position for _, position in words]
+
+        # Type-ahead repeats the same prefixes (and pages through them)
+        self._matches = lru_cache(maxsize=MATCH_CACHE_SIZE)(self._find)
+
+    def __len__(self):
+        return len(self.teams)
+
+    def _find(self, prefix):
+        """Return the catalogue positions matching a normalised prefix, best first."""
+        if not prefix:
+            return range(len(self.teams))
+
+        upper = prefix + '\U0010ffff'
+        start = bisect_left(self._names, prefix)
+        stop = bisect_left(self._names, upper, lo=start)
+
+        word_start = bisect_left(self._word_keys, prefix)
+        word_stop = bisect_left(self._word_keys, upper, lo=word_start)
+        # Whole-name matches rank ahead of matches on a later word
+        later = sorted({position for position in self._word_positions[word_start:word_stop]
+                        if not start <= position < stop})
+        return tuple(range(start, stop)) + tuple(later)
+
+    def search(self, query, page=1, size=20):
+        """
+        Find teams with a word starting with the query.
+
+        Args:
+            query (str): Typed prefix (case-insensitive; empty matches every team)
+            page (int): 1-based results page
+            size (int): Results per page
+
+        Returns:
+            dict: {'Records', 'TotalItems', 'CurrentPage', 'PageSize', 'HasNextPage'}
+        """
+        positions = self._matches(normalise(query))
+
+        first = (page - 1) * size
+        records = [{field: self.teams[position].get(field) for field in TEAM_SEARCH_FIELDS}
+                   for position in positions[first:first + size]]
+        return {
+            'Records': records,
+            'TotalItems': len(positions),
+            'CurrentPage': page,
+            'PageSize': size,
+            'HasNextPage': first + size < len(positions)
+        }
@@ -0,0 +1,10 @@
+"""
+Shared test setup: backend modules are imported flat from my-flask-app/.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SECRET_KEY', 'test')
+os.environ.pop('INVOICE_MIRROR_DB', None)
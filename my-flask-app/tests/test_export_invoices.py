@@ -0,0 +1,94 @@
+"""
+Tests for the streaming /export_invoices endpoint.
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+import app as backend
+import nexudus_client
+from invoice_records import InvoiceRecord
+
+MONTHS = [{'month': 3, 'year': 2024}]
+
+def make_invoice(record_id):
+    return InvoiceRecord(record_id, 'Startup A', '2024-03-01T00:00:00Z',
+                         '2024-03-31T00:00:00Z', 100.0, f"INV-{record_id}")
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(backend, 'resolve_auth_headers',
+                        lambda: ({'Authorization': 'Basic dGVzdDp0ZXN0'}, None))
+    return backend.app.test_client()
+
+def export(client, **headers):
+    return client.post('/export_invoices', headers=headers, json={
+        'team_name': 'Startup A', 'months': MONTHS, 'format': 'csv', 'freshness': 'live'})
+
+def test_csv_export_streams_every_page(client, monkeypatch):
+    def pages(*args, **kwargs):
+        yield [make_invoice(1)]
+        yield [make_invoice(2)]
+
+    monkeypatch.setattr(backend, 'iter_invoices_for_periods', pages)
+    response = export(client)
+
+    assert response.status_code == 200
+    rows = response.get_data(as_text=True).splitlines()
+    assert rows[0].startswith('Invoice ID,Company Name')
+    assert [row.split(',')[0] for row in rows[1:]] == ['1', '2']
+
+def test_failure_after_streaming_started_is_not_a_complete_download(client, monkeypatch):
+    def pages(*args, **kwargs):
+        yield [make_invoice(1)]
+        raise nexudus_client.NexudusAPIError("page 2 failed", status_code=503)
+
+    monkeypatch.setattr(backend, 'iter_invoices_for_periods', pages)
+    response = export(client)
+    assert response.status_code == 200
+
+    # The error must escape the body iterator so the server aborts the transfer
+    with pytest.raises(nexudus_client.NexudusAPIError):
+        response.get_data()
+
+def test_mirror_read_failure_falls_back_to_nexudus(client, monkeypatch):
+    class BrokenMirror:
+        def query_invoices(self, team_name, ranges):
+            raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(backend, 'mirror', BrokenMirror())
+    monkeypatch.setattr(backend, 'use_mirror', lambda headers, freshness='mirror': True)
+    monkeypatch.setattr(nexudus_client, 'iter_pages', lambda *args, **kwargs: iter([[make_invoice(1)]]))
+
+    response = client.post('/export_invoices', json={
+        'team_name': 'Startup A', 'months': MONTHS, 'format': 'csv'})
+    assert response.status_code == 200
+    assert len(response.get_data(as_text=True).splitlines()) == 2
+
+def test_non_adjacent_months_are_fetched_concurrently_in_order(monkeypatch):
+    started = {}
+    both_started = threading.Event()
+
+    def pages(path, headers, params, size, project=None, priority=None):
+        month = params['from_Invoice_InvoiceFromDate'][:7]
+        started[month] = True
+        if len(started) == 2:
+            both_started.set()
+        # The January crawl only finishes once the March crawl has started
+        assert both_started.wait(5)
+        yield [make_invoice(1 if month == '2024-01' else 3)]
+
+    monkeypatch.setattr(backend, 'use_mirror', lambda headers, freshness='mirror': False)
+    monkeypatch.setattr(nexudus_client, 'iter_pages', pages)
+
+    months = [{'month': 3, 'year': 2024}, {'month': 1, 'year': 2024}]
+    streamed = backend.iter_invoices_for_periods({'Authorization': 'Basic dGVzdDp0ZXN0'},
+                                                 'Startup A', months)
+    assert [[invoice.RecordID for invoice in page] for page in streamed] == [[1], [3]]
+
+def test_invoice_pages_are_requested_in_chronological_order():
+    params = backend.invoice_range_params('Startup A', '2024-01-01', '2024-12-31')
+    assert params['orderBy'] == 'InvoiceFromDate'
+    assert params['dir'] == 'Ascending'
@@ -0,0 +1,58 @@
+"""
+Tests for the local SQLite invoice mirror.
+"""
+
+import time
+from datetime import datetime, timezone
+
+import invoice_mirror
+import nexudus_client
+
+def test_watermark_never_passes_sync_start_minus_overlap(tmp_path, monkeypatch):
+    # A record stamped "now" was read; an earlier page may have changed since
+    now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    requested = []
+
+    def pages(path, headers, params, size, project=None, priority=None):
+        requested.append(dict(params))
+        yield [{'RecordID': 1, 'Invoice_BillToName': 'Startup A', 'TeamName': 'Startup A',
+                'UpdatedOn': now}]
+
+    monkeypatch.setattr(nexudus_client, 'iter_pages', pages)
+    mirror = invoice_mirror.InvoiceMirror(str(tmp_path / 'mirror.db'))
+    started = time.time()
+    mirror.sync({})
+    mirror.sync({})
+
+    watermark = [params for params in requested if 'from_Invoice_UpdatedOn' in params][-1][
+        'from_Invoice_UpdatedOn']
+    limit = datetime.fromtimestamp(started - invoice_mirror.MIRROR_SYNC_OVERLAP_SECONDS,
+                                   timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+    assert watermark <= limit
+
+def test_full_reconciliation_removes_records_deleted_upstream(tmp_path, monkeypatch):
+    def invoice(record_id):
+        return {'RecordID': record_id, 'Invoice_BillToName': 'Startup A', 'UpdatedOn': '2024-04-01T00:00:00Z',
+                'Invoice_InvoiceFromDate': '2024-03-01', 'Invoice_InvoiceToDate': '2024-03-31'}
+
+    upstream = {'invoices': [invoice(1), invoice(2)],
+                'teams': [{'RecordID': 7, 'TeamName': 'Startup A', 'UpdatedOn': '2024-04-01T00:00:00Z'}]}
+    march = [('2024-03-01', '2024-03-31')]
+
+    def pages(path, headers, params, size, project=None, priority=None):
+        resource = 'invoices' if path == 'billing/invoices' else 'teams'
+        yield list(upstream[resource])
+
+    monkeypatch.setattr(nexudus_client, 'iter_pages', pages)
+    mirror = invoice_mirror.InvoiceMirror(str(tmp_path / 'mirror.db'))
+    mirror.sync({})
+    upstream['invoices'].pop()
+
+    # An incremental sync cannot see the deletion
+    mirror.sync({})
+    assert [invoice.RecordID for invoice in mirror.query_invoices('Startup A', march)] == [1, 2]
+
+    monkeypatch.setattr(invoice_mirror, 'MIRROR_RECONCILE_INTERVAL_SECONDS', 0)
+    mirror.sync({})
+    assert [invoice.RecordID for invoice in mirror.query_invoices('Startup A', march)] == [1]
+    assert [team['RecordID'] for team in mirror.list_teams()] == [7]
@@ -0,0 +1,100 @@
+"""
+Tests for the per-month rollups behind /invoice_summary.
+"""
+
+import pytest
+
+import app as backend
+import upstream_scheduler
+from invoice_records import InvoiceRecord
+
+HEADERS = {'Authorization': 'Basic dGVzdDp0ZXN0'}
+CLOSED_MONTH = [{'month': 3, 'year': 2024}]
+
+def make_invoice(amount):
+    return InvoiceRecord(1, 'Startup A', '2024-03-01T00:00:00Z',
+                         '2024-03-31T00:00:00Z', amount, 'INV-1')
+
+@pytest.fixture(autouse=True)
+def empty_rollup_cache():
+    backend.rollup_cache.clear()
+    yield
+    backend.rollup_cache.clear()
+
+@pytest.fixture
+def sources(monkeypatch):
+    """Serve 100.0 from the mirror and 250.0 from Nexudus, counting live reads."""
+    live_reads = []
+
+    def fetch(headers, team_name, months, priority=None):
+        live_reads.append(months)
+        return True, [make_invoice(250.0)]
+
+    class Mirror:
+        def query_invoices(self, team_name, ranges):
+            return [make_invoice(100.0)]
+
+    monkeypatch.setattr(backend, 'mirror', Mirror())
+    monkeypatch.setattr(backend, 'use_mirror', lambda headers, freshness='mirror': freshness != 'live')
+    monkeypatch.setattr(backend, 'fetch_invoices_for_periods', fetch)
+    return live_reads
+
+def cached_total():
+    entry = backend.rollup_cache.get((backend.credential_key(HEADERS), 'Startup A', 2024, 3))
+    return entry and entry[0]
+
+def test_closed_months_read_from_the_mirror_are_not_cached(sources):
+    success, _ = backend.rollup_team_months('Startup A', HEADERS, CLOSED_MONTH, 'mirror')
+    assert success
+    assert cached_total() is None
+
+def test_live_reads_bypass_and_refresh_the_cache(sources):
+    backend.rollup_team_months('Startup A', HEADERS, CLOSED_MONTH, 'live')
+    backend.rollup_team_months('Startup A', HEADERS, CLOSED_MONTH, 'live')
+    assert len(sources) == 2
+    assert cached_total() == 250.0
+
+    # Mirror-allowed reads reuse the entry cached from live data
+    backend.rollup_team_months('Startup A', HEADERS, CLOSED_MONTH, 'mirror')
+    assert len(sources) == 2
+
+def test_month_total_does_not_depend_on_the_other_months_requested(monkeypatch):
+    march_only = InvoiceRecord(1, 'Startup A', '2024-03-01T00:00:00Z', '2024-03-31T00:00:00Z', 10.0, 'INV-1')
+    spanning = InvoiceRecord(2, 'Startup A', '2024-03-15T00:00:00Z', '2024-04-14T00:00:00Z', 100.0, 'INV-2')
+
+    def fetch(headers, team_name, months, priority=None):
+        # One merged range returns the invoice spanning March and April too
+        return True, [march_only, spanning] if len(months) > 1 else [march_only]
+
+    monkeypatch.setattr(backend, 'use_mirror', lambda headers, freshness='mirror': False)
+    monkeypatch.setattr(backend, 'fetch_invoices_for_periods', fetch)
+
+    backend.rollup_team_months('Startup A', HEADERS, CLOSED_MONTH + [{'month': 4, 'year': 2024}], 'live')
+    assert cached_total() == 10.0
+
+    backend.rollup_cache.clear()
+    backend.rollup_team_months('Startup A', HEADERS, CLOSED_MONTH, 'live')
+    assert cached_total() == 10.0
+
+@pytest.mark.parametrize('team_names, priority', [
+    (['Startup A'], upstream_scheduler.INTERACTIVE),
+    (['Startup A', 'Startup B'], upstream_scheduler.BATCH),
+    ('all', upstream_scheduler.BATCH),
+])
+def test_multi_team_summaries_run_at_batch_priority(monkeypatch, team_names, priority):
+    priorities = []
+
+    def fetch(headers, team_name, months, priority=None):
+        priorities.append(priority)
+        return True, [make_invoice(250.0)]
+
+    monkeypatch.setattr(backend, 'resolve_auth_headers', lambda: (HEADERS, None))
+    monkeypatch.setattr(backend, 'use_mirror', lambda headers, freshness='mirror': False)
+    monkeypatch.setattr(backend, 'fetch_invoices_for_periods', fetch)
+    monkeypatch.setattr(backend, 'fetch_teams', lambda headers: (True, {'data': {'Records': [
+        {'TeamName': 'Startup A'}, {'TeamName': 'Startup B'}]}}))
+
+    response = backend.app.test_client().post('/invoice_summary', json={
+        'team_names': team_names, 'months': CLOSED_MONTH, 'freshness': 'live'})
+    assert response.status_code == 200
+    assert set(priorities) == {priority}
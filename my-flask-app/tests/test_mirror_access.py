@@ -0,0 +1,64 @@
+"""
+Tests for who may be answered from the local mirror.
+"""
+
+import json
+import time
+
+import pytest
+import requests
+
+import app as backend
+import invoice_mirror
+import nexudus_client
+
+OWN_TEAMS = [{'RecordID': 1, 'TeamName': 'Alpha Coffee'}, {'RecordID': 2, 'TeamName': 'Beta Labs'}]
+
+@pytest.fixture
+def mirror(tmp_path, monkeypatch):
+    mirror = invoice_mirror.InvoiceMirror(str(tmp_path / 'mirror.db'))
+    mirror._upsert('teams', OWN_TEAMS)
+    for resource in invoice_mirror.RESOURCES:
+        mirror._save_sync_state(resource, None, time.time(), time.time())
+    monkeypatch.setattr(backend, 'mirror', mirror)
+    backend.mirror_access_cache.clear()
+    yield mirror
+    backend.mirror_access_cache.clear()
+
+def visible_teams(monkeypatch, teams, total):
+    """Make spaces/teams answer with the given first page and TotalItems."""
+    calls = []
+
+    def get(path, headers=None, params=None, **kwargs):
+        calls.append(path)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({'Records': teams, 'TotalItems': total}).encode()
+        return response
+
+    monkeypatch.setattr(nexudus_client, 'get', get)
+    return calls
+
+def headers_for(email):
+    return {'Authorization': backend.encode_auth(email, 'secret')}
+
+def test_account_of_the_mirrored_business_reads_the_mirror(mirror, monkeypatch):
+    calls = visible_teams(monkeypatch, OWN_TEAMS[:1], 2)
+    assert backend.use_mirror(headers_for('staff@comotion.example'))
+    assert backend.use_mirror(headers_for('staff@comotion.example'))
+    assert len(calls) == 1
+
+def test_account_of_another_business_reads_live(mirror, monkeypatch):
+    visible_teams(monkeypatch, [{'RecordID': 99, 'TeamName': 'Elsewhere'}], 2)
+    assert not backend.use_mirror(headers_for('admin@other.example'))
+
+def test_account_seeing_part_of_the_catalogue_reads_live(mirror, monkeypatch):
+    visible_teams(monkeypatch, OWN_TEAMS[:1], 1)
+    assert not backend.use_mirror(headers_for('limited@comotion.example'))
+
+def test_allowlist_restricts_mirror_reads(mirror, monkeypatch):
+    calls = visible_teams(monkeypatch, OWN_TEAMS[:1], 2)
+    monkeypatch.setattr(backend, 'MIRROR_ALLOWED_USERS', {'finance@comotion.example'})
+    assert not backend.use_mirror(headers_for('staff@comotion.example'))
+    assert backend.use_mirror(headers_for('Finance@CoMotion.example'))
+    assert len(calls) == 1
@@ -0,0 +1,43 @@
+"""
+Tests for the team catalogue (/get_teams and /search_teams).
+"""
+
+import pytest
+
+import app as backend
+import invoice_mirror
+import nexudus_client
+
+HEADERS = {'Authorization': 'Basic dGVzdDp0ZXN0'}
+
+@pytest.fixture(autouse=True)
+def empty_teams_cache():
+    backend.teams_cache.clear()
+    yield
+    backend.teams_cache.clear()
+
+def test_fresh_mirror_serves_the_catalogue_without_crawling(tmp_path, monkeypatch):
+    mirror = invoice_mirror.InvoiceMirror(str(tmp_path / 'mirror.db'))
+    mirror._upsert('teams', [{'RecordID': 2, 'TeamName': 'Beta Labs'},
+                             {'RecordID': 1, 'TeamName': 'Alpha Coffee'}])
+    monkeypatch.setattr(backend, 'mirror', mirror)
+    monkeypatch.setattr(backend, 'use_mirror', lambda headers, freshness='mirror': True)
+
+    def crawl(*args, **kwargs):
+        raise AssertionError("Nexudus should not be crawled")
+
+    monkeypatch.setattr(nexudus_client, 'iter_pages', crawl)
+
+    success, entry = backend.fetch_teams(HEADERS)
+    assert success
+    assert [team['TeamName'] for team in entry['data']['Records']] == ['Alpha Coffee', 'Beta Labs']
+    assert entry['index'].search('bet')['Records'] == [{'RecordID': 2, 'TeamName': 'Beta Labs'}]
+
+def test_refresh_reads_nexudus_even_with_a_fresh_mirror(monkeypatch):
+    monkeypatch.setattr(backend, 'use_mirror', lambda headers, freshness='mirror': True)
+    monkeypatch.setattr(nexudus_client, 'iter_pages',
+                        lambda *args, **kwargs: iter([[{'RecordID': 3, 'TeamName': 'Live Team'}]]))
+
+    success, entry = backend.fetch_teams(HEADERS, refresh=True)
+    assert success
+    assert entry['data']['TotalItems'] == 1
@@ -0,0 +1,120 @@
+"""
+Tests for upstream admission control (UpstreamScheduler, SingleFlight) and
+how nexudus_client uses it.
+"""
+
+import io
+import threading
+import time
+
+import pytest
+import requests
+
+import nexudus_client
+from upstream_scheduler import BACKGROUND, BATCH, INTERACTIVE, SingleFlight, UpstreamScheduler
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+def test_waiting_callers_are_served_in_priority_order():
+    scheduler = UpstreamScheduler(rate=50, burst=1)
+    scheduler.pause(0.3)
+    served = []
+
+    def acquire(priority):
+        scheduler.acquire(priority)
+        served.append(priority)
+
+    threads = [threading.Thread(target=acquire, args=(priority,))
+               for priority in (BACKGROUND, BATCH, INTERACTIVE)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: len(scheduler._waiting) == 3)
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert served == [INTERACTIVE, BATCH, BACKGROUND]
+
+def test_pause_holds_back_every_caller():
+    scheduler = UpstreamScheduler(rate=1000, burst=10)
+    scheduler.pause(0.2)
+    assert scheduler.acquire(INTERACTIVE) >= 0.15
+
+def test_throttled_response_pauses_the_scheduler(monkeypatch):
+    throttled = requests.Response()
+    throttled.status_code = 429
+    throttled.headers['Retry-After'] = '7'
+    throttled.raw = io.BytesIO()
+    ok = requests.Response()
+    ok.status_code = 200
+    responses = iter([throttled, ok])
+
+    pauses = []
+
+    class Scheduler:
+        def acquire(self, priority):
+            return 0.0
+
+        def pause(self, seconds):
+            pauses.append(seconds)
+
+    monkeypatch.setattr(nexudus_client, '_scheduler', Scheduler())
+    monkeypatch.setattr(nexudus_client._session, 'get', lambda *args, **kwargs: next(responses))
+    monkeypatch.setattr(nexudus_client.time, 'sleep', lambda seconds: None)
+
+    assert nexudus_client.get('spaces/teams').status_code == 200
+    assert pauses == [7.0]
+
+def test_followers_share_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+    results = {}
+
+    def leader():
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    def follow():
+        try:
+            flight.do('key', lambda: results.setdefault('follower_ran', True))
+        except ValueError as e:
+            results['follower_error'] = e
+
+    leading = threading.Thread(target=lambda: pytest.raises(ValueError, flight.do, 'key', leader))
+    leading.start()
+    wait_until(lambda: 'key' in flight._calls)
+    following = threading.Thread(target=follow)
+    following.start()
+    time.sleep(0.1)  # let the follower join the call in flight
+    release.set()
+    leading.join(timeout=5)
+    following.join(timeout=5)
+
+    assert 'follower_ran' not in results
+    assert str(results['follower_error']) == "upstream failed"
+    assert flight._calls == {}
+
+def test_calls_with_different_priorities_are_not_coalesced(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def send(path, headers, params, timeout, priority):
+        calls.append(priority)
+        release.wait(5)
+        return priority
+
+    monkeypatch.setattr(nexudus_client, '_get_with_retries', send)
+    threads = [threading.Thread(target=nexudus_client.get, args=('spaces/teams',),
+                                kwargs={'priority': priority})
+               for priority in (BATCH, INTERACTIVE)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: len(calls) == 2)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert sorted(calls) == [INTERACTIVE, BATCH]
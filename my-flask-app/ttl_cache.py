@@ -0,0 +1,93 @@
+"""
+CoMotion Financial Reports Automation - In-Process TTL/LRU Cache
+
+Small thread-safe cache used to keep hot upstream results (such as the team
+list) in memory. Entries expire after a fixed time-to-live, and once the
+cache is full the least recently used entry is evicted.
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+class TTLCache:
+    """
+    Thread-safe mapping with per-entry expiry and LRU eviction.
+
+    Args:
+        maxsize (int): Maximum number of entries kept
+        ttl (float): Seconds an entry stays valid after it is stored
+        name (str): Label for hit/miss metrics (lookups are not counted when None)
+    """
+
+    def __init__(self, maxsize=256, ttl=300, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return a cached value, or None if it is missing or expired.
+
+        Args:
+            key (hashable): Cache key
+
+        Returns:
+            object or None: Cached value
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if self.name is not None:
+            metrics.record_cache(self.name, entry is not None)
+        return None if entry is None else entry[1]
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value, evicting the least recently used entry if full.
+
+        Args:
+            key (hashable): Cache key
+            value (object): Value to store
+            ttl (float): Override of the cache-wide time-to-live
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """
+        Drop a single entry.
+
+        Args:
+            key (hashable): Cache key
+
+        Returns:
+            bool: True if an entry was removed
+        """
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,161 @@
+"""
+CoMotion Financial Reports Automation - Upstream Request Scheduler
+
+Central admission control for calls to the Nexudus API:
+
+- A token bucket caps the request rate of the whole process, so many staff
+  running reports at once stay under Nexudus' throttling limits instead of
+  each worker being throttled and retrying on its own. A 429 with
+  Retry-After pauses the bucket for every caller.
+- Callers waiting for a token are served in priority order (interactive
+  requests ahead of batch exports ahead of background syncs), first come
+  first served within a priority.
+- Identical concurrent requests (same credentials, endpoint, params and
+  priority) are coalesced: one call goes upstream and every caller gets
+  its result.
+
+Limits apply per process; with several gunicorn workers divide the
+intended rate between them.
+
+Author: Rohan Simha
+Created for: CoMotion Startup Incubator
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+# Request priorities (lower is served first)
+INTERACTIVE = 0
+BATCH = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BATCH: 'batch', BACKGROUND: 'background'}
+
+class UpstreamScheduler:
+    """
+    Token-bucket rate limiter that grants tokens in priority order.
+
+    Args:
+        rate (float): Tokens added per second (0 or less disables the limit)
+        burst (int): Bucket capacity, i.e. requests allowed back to back
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def _seconds_until_token(self):
+        """Refill the bucket and return how long the next token is away (lock held)."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def acquire(self, priority=INTERACTIVE):
+        """
+        Block until this caller may send one upstream request.
+
+        Args:
+            priority (int): INTERACTIVE, BATCH or BACKGROUND
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        started = time.monotonic()
+        with self._condition:
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    if self._waiting[0] != entry:
+                        # Someone ahead in the queue; wait until a token is handed out
+                        self._condition.wait()
+                        continue
+                    delay = self._seconds_until_token()
+                    if delay <= 0:
+                        heapq.heappop(self._waiting)
+                        self._tokens -= 1
+                        self._condition.notify_all()
+                        return time.monotonic() - started
+                    self._condition.wait(delay)
+            except BaseException:
+                # Leave the queue (e.g. interrupted) without blocking the callers behind
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                self._condition.notify_all()
+                raise
+
+    def pause(self, seconds):
+        """
+        Stop granting tokens for a while, e.g. after Nexudus sent Retry-After.
+
+        Args:
+            seconds (float): Pause length
+        """
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running wait for and share its result (or exception). Results
+    are not cached once the call has finished.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """
+        Run func, or join an identical call that is already in flight.
+
+        Args:
+            key (hashable): Identity of the call
+            func (callable): Zero-argument function producing the result
+
+        Returns:
+            tuple: (result, shared: bool) where shared is True when the result
+                came from another caller's call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+
+        if not leader:
+            return call.result(), True
+
+        try:
+            result = func()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            call.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._calls[key]
+        call.set_result(result)
+        return result, False